@@ -16,7 +16,7 @@ echo Python found. Starting build process...
 echo.
 
 REM Run the build script
-python build_portable.py
+python build_portable.py %*
 
 echo.
 echo Build process completed.
@@ -4,14 +4,28 @@ Build script to create a portable executable from the File Copier GUI applicatio
 
 This script uses PyInstaller to create a standalone executable that can be run
 on any Windows machine without requiring Python to be installed.
+
+Usage:
+    python build_portable.py            # single .exe file (unpacks itself on every launch)
+    python build_portable.py --onedir   # startup-optimized folder build (starts much faster)
 """
 
+import argparse
+import statistics
 import subprocess
 import sys
 import os
+import time
 from pathlib import Path
 
 
+APP_NAME = "StarzShotsFileCopier"
+
+# Number of launches timed by the startup check, and the target time for each
+STARTUP_CHECK_RUNS = 3
+STARTUP_TIME_BUDGET = 2.0
+
+
 def install_pyinstaller():
     """Install PyInstaller if not already installed."""
     try:
@@ -29,31 +43,47 @@ def install_pyinstaller():
             return False
 
 
-def build_executable():
+def executable_path(onedir: bool) -> Path:
+    """Return where PyInstaller puts the executable for the chosen layout."""
+    exe_name = APP_NAME + (".exe" if os.name == "nt" else "")
+    if onedir:
+        return Path("dist") / APP_NAME / exe_name
+    return Path("dist") / exe_name
+
+
+def build_executable(onedir: bool = False):
     """Build the portable executable."""
     print("Building portable executable...")
     
     # PyInstaller command
     cmd = [
         "pyinstaller",
-        "--onefile",                    # Create a single executable file
+        "--onedir" if onedir else "--onefile",  # Folder build starts fast; single file unpacks on every launch
         "--windowed",                   # Hide console window (GUI app)
-        "--name=StarzShotsFileCopier",  # Name of the executable
+        f"--name={APP_NAME}",           # Name of the executable
         "--icon=NONE",                 # No icon (you can add one later)
-        "--add-data=sample_reference.txt;.",  # Include sample reference file
-        "file_copier.py"               # Main script
+        f"--add-data=sample_reference.txt{os.pathsep}.",  # Include sample reference file
     ]
+    if onedir:
+        cmd.append("--noupx")           # Skip UPX so libraries are not decompressed at launch
+    cmd.append("file_copier.py")       # Main script (copy_engine.py is picked up automatically)
     
     try:
         subprocess.check_call(cmd)
         print("\n" + "="*50)
         print("BUILD SUCCESSFUL!")
         print("="*50)
-        print("Your portable executable is located at:")
-        print("  dist/StarzShotsFileCopier.exe")
-        print("\nYou can copy this file to any Windows computer and run it")
-        print("without needing Python installed.")
-        print("\nThe sample reference file is included in the executable.")
+        if onedir:
+            print("Your portable application folder is located at:")
+            print(f"  dist/{APP_NAME}/")
+            print("\nCopy the whole folder to any Windows computer and run")
+            print(f"{executable_path(onedir).name} inside it without needing Python installed.")
+        else:
+            print("Your portable executable is located at:")
+            print(f"  {executable_path(onedir).as_posix()}")
+            print("\nYou can copy this file to any Windows computer and run it")
+            print("without needing Python installed.")
+        print("\nThe sample reference file is included in the build.")
         return True
     except subprocess.CalledProcessError as e:
         print(f"Build failed: {e}")
@@ -63,8 +93,39 @@ def build_executable():
         return False
 
 
+def check_startup_time(exe_path: Path) -> None:
+    """Launch the built application a few times and report how long it takes to show its window."""
+    print(f"\nMeasuring startup time ({STARTUP_CHECK_RUNS} launches)...")
+    timings = []
+    for _ in range(STARTUP_CHECK_RUNS):
+        start = time.perf_counter()
+        try:
+            # --startup-check closes the window as soon as it has been drawn
+            subprocess.run([str(exe_path), "--startup-check"], check=True, timeout=60)
+        except (OSError, subprocess.SubprocessError) as e:
+            print(f"Warning: Could not measure startup time: {e}")
+            return
+        timings.append(time.perf_counter() - start)
+
+    median = statistics.median(timings)
+    print(f"Startup time: {median:.2f}s median "
+          f"(runs: {', '.join(f'{t:.2f}s' for t in timings)})")
+    if median > STARTUP_TIME_BUDGET:
+        print(f"Warning: Startup is slower than the {STARTUP_TIME_BUDGET:.1f}s target.")
+        print("Try the startup-optimized build: python build_portable.py --onedir")
+    else:
+        print(f"Startup is within the {STARTUP_TIME_BUDGET:.1f}s target.")
+
+
 def main():
     """Main build function."""
+    parser = argparse.ArgumentParser(description="Build the portable Starz Shots executable.")
+    parser.add_argument("--onedir", action="store_true",
+                        help="build a startup-optimized folder instead of a single .exe")
+    parser.add_argument("--skip-startup-check", action="store_true",
+                        help="do not time the built application's startup")
+    args = parser.parse_args()
+
     print("Starz Shots File Copier - Portable Build Script")
     print("="*48)
     
@@ -79,8 +140,11 @@ def main():
         return
     
     # Build the executable
-    if build_executable():
+    if build_executable(args.onedir):
         print("\nBuild completed successfully!")
+
+        if not args.skip_startup_check:
+            check_startup_time(executable_path(args.onedir))
         
         # Clean up build files (optional)
         cleanup = input("\nDo you want to clean up build files? (y/n): ").strip().lower()
@@ -89,8 +153,8 @@ def main():
             try:
                 if Path("build").exists():
                     shutil.rmtree("build")
-                if Path("StarzShotsFileCopier.spec").exists():
-                    Path("StarzShotsFileCopier.spec").unlink()
+                if Path(f"{APP_NAME}.spec").exists():
+                    Path(f"{APP_NAME}.spec").unlink()
                 print("Build files cleaned up.")
             except Exception as e:
                 print(f"Warning: Could not clean up build files: {e}")
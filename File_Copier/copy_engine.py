@@ -0,0 +1,1052 @@
+#!/usr/bin/env python3
+"""
+Copy engine for the Starz Shots application.
+
+Everything that indexes, plans, copies, archives and reconciles files lives
+here, separate from the GUI, so the application window can appear before
+any of it (or the heavier standard library modules it needs) is imported.
+"""
+
+import csv
+import math
+import os
+import queue
+import re
+import select
+import shutil
+import struct
+import sys
+import tarfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple, Optional
+
+
+# Size of the read/write buffer used when copying file contents
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# Already-compressed formats that are stored rather than deflated in zip archives
+STORED_EXTENSIONS = {
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.heic', '.heif',
+    '.cr2', '.cr3', '.nef', '.arw', '.raf', '.orf', '.rw2', '.dng',
+    '.mp4', '.mov', '.m4v', '.avi', '.mkv', '.mxf', '.mts',
+    '.mp3', '.m4a', '.aac',
+    '.zip', '.7z', '.rar', '.gz', '.bz2', '.xz',
+}
+
+# Reconciliation report statuses, in the order they are written to the CSV
+RECONCILE_STATUSES = (
+    "missing_from_source",
+    "missing_from_destination",
+    "size_mismatch",
+    "extra_in_destination",
+)
+
+# How often the watch folder loop checks the drop folder for new reference files
+WATCH_LOOP_INTERVAL = 1.0
+
+# How often the polling fallback re-checks source directories for changes
+WATCH_POLL_INTERVAL = 2.0
+
+# How often the inotify monitor also polls, as a safety net for missed events
+INOTIFY_SAFETY_POLL_INTERVAL = 30.0
+
+# Minimum number of seconds between progress bar refreshes during a copy
+PROGRESS_UPDATE_INTERVAL = 0.1
+
+# Files at or above this size go through the large-file lane
+LARGE_FILE_THRESHOLD = 64 * 1024 * 1024
+
+# Small files are dominated by per-file overhead, so many run at once
+SMALL_FILE_WORKERS = 8
+
+# Large files are sequential streams; a few big buffers keep the disk busy
+LARGE_FILE_WORKERS = 2
+LARGE_FILE_BUFFER_SIZE = 8 * 1024 * 1024
+
+# Longest single sleep while waiting on the rate limiter, so rate changes apply quickly
+RATE_LIMIT_MAX_SLEEP = 0.1
+
+# Smallest write used while bandwidth is throttled
+MIN_THROTTLED_CHUNK_SIZE = 64 * 1024
+
+
+def format_bytes(num_bytes: float) -> str:
+    """Format a byte count as a human readable string."""
+    if abs(num_bytes) < 1024:
+        return f"{int(num_bytes)} B"
+    for unit in ("KB", "MB", "GB"):
+        num_bytes /= 1024
+        if abs(num_bytes) < 1024:
+            return f"{num_bytes:.1f} {unit}"
+    return f"{num_bytes / 1024:.1f} TB"
+
+
+def format_duration(seconds: float) -> str:
+    """Format a number of seconds as H:MM:SS or M:SS."""
+    seconds = int(round(seconds))
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes}:{seconds:02d}"
+
+
+def parse_reference_file(reference_file: str) -> List[str]:
+    """Read a reference file and return its file names, skipping blank lines and comments."""
+    with open(reference_file, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+
+    # Clean up file names (remove whitespace and empty lines)
+    filenames = []
+    for line in lines:
+        filename = line.strip()
+        if filename and not filename.startswith('#'):  # Skip empty lines and comments
+            filenames.append(filename)
+    return filenames
+
+
+class SourceIndex:
+    """
+    In-memory index of every file under a source directory, keyed by file name.
+
+    The index is built with a single os.scandir walk, and sizes come from
+    the directory entries themselves, so no extra stat call is needed per
+    file on most platforms. It can then be kept warm: rescan_directory()
+    refreshes one directory, and poll() rescans only the directories whose
+    modification time has changed. Names are compared with os.path.normcase,
+    so lookups are case-insensitive on Windows like the rest of the file
+    system. When a name exists in several places, the lowest path wins.
+    All methods are safe to call from multiple threads.
+    """
+
+    def __init__(self, source_dir: str):
+        self.source_dir = source_dir
+        self._lock = threading.RLock()
+        self._by_name = {}       # normalized name -> {path: size}
+        self._dir_files = {}     # directory -> set of file names directly inside it
+        self._dir_subdirs = {}   # directory -> set of subdirectory names
+        self._dir_mtimes = {}    # directory -> st_mtime_ns when it was last listed
+        self._file_count = 0
+
+    def __len__(self) -> int:
+        return self._file_count
+
+    def build(self) -> None:
+        """(Re)build the whole index from a fresh walk of the source directory."""
+        with self._lock:
+            self._by_name.clear()
+            self._dir_files.clear()
+            self._dir_subdirs.clear()
+            self._dir_mtimes.clear()
+            self._file_count = 0
+            self.scan_tree(self.source_dir)
+
+    def directories(self) -> List[str]:
+        """Every directory currently covered by the index."""
+        with self._lock:
+            return list(self._dir_mtimes)
+
+    def lookup(self, filename: str) -> Optional[Tuple[str, int]]:
+        """Return (path, size) for a file name, or None if it is not in the source."""
+        with self._lock:
+            matches = self._by_name.get(os.path.normcase(filename))
+            if not matches:
+                return None
+            path = min(matches)
+            return path, matches[path]
+
+    def _add_file(self, path: str, size: int) -> None:
+        matches = self._by_name.setdefault(os.path.normcase(os.path.basename(path)), {})
+        if path not in matches:
+            self._file_count += 1
+        matches[path] = size
+
+    def _remove_file(self, path: str) -> None:
+        key = os.path.normcase(os.path.basename(path))
+        matches = self._by_name.get(key)
+        if matches and matches.pop(path, None) is not None:
+            self._file_count -= 1
+            if not matches:
+                del self._by_name[key]
+
+    def rescan_directory(self, directory: str) -> List[str]:
+        """
+        Re-list one directory and apply the differences to the index.
+
+        Returns the subdirectories that were not indexed before; their
+        contents still need scanning. A directory that has disappeared is
+        removed along with everything below it.
+        """
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+            files = {}
+            subdirs = set()
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.add(entry.name)
+                        elif entry.is_file():
+                            files[entry.name] = entry.stat().st_size
+                    except OSError:
+                        continue
+        except OSError:
+            self.remove_tree(directory)
+            return []
+
+        with self._lock:
+            for name in self._dir_files.get(directory, set()) - files.keys():
+                self._remove_file(os.path.join(directory, name))
+            for name, size in files.items():
+                self._add_file(os.path.join(directory, name), size)
+
+            old_subdirs = self._dir_subdirs.get(directory, set())
+            for name in old_subdirs - subdirs:
+                self.remove_tree(os.path.join(directory, name))
+
+            self._dir_files[directory] = set(files)
+            self._dir_subdirs[directory] = subdirs
+            self._dir_mtimes[directory] = mtime
+            return [os.path.join(directory, name) for name in sorted(subdirs - old_subdirs)]
+
+    def scan_tree(self, directory: str) -> None:
+        """Index a directory and everything below it."""
+        pending = [directory]
+        while pending:
+            pending.extend(self.rescan_directory(pending.pop()))
+
+    def remove_tree(self, directory: str) -> None:
+        """Drop a directory and everything below it from the index."""
+        prefix = directory.rstrip(os.sep) + os.sep
+        with self._lock:
+            for path in [d for d in self._dir_mtimes if d == directory or d.startswith(prefix)]:
+                for name in self._dir_files.pop(path, set()):
+                    self._remove_file(os.path.join(path, name))
+                self._dir_subdirs.pop(path, None)
+                del self._dir_mtimes[path]
+            parent, name = os.path.split(directory)
+            self._dir_subdirs.get(parent, set()).discard(name)
+
+    def update_file(self, path: str) -> None:
+        """Add or refresh a single file after it was created or rewritten."""
+        try:
+            size = os.stat(path).st_size
+        except OSError:
+            self.remove_file(path)
+            return
+        directory, name = os.path.split(path)
+        with self._lock:
+            if directory in self._dir_files:
+                self._dir_files[directory].add(name)
+                self._add_file(path, size)
+
+    def remove_file(self, path: str) -> None:
+        """Drop a single file after it was deleted or moved away."""
+        directory, name = os.path.split(path)
+        with self._lock:
+            self._dir_files.get(directory, set()).discard(name)
+            self._remove_file(path)
+
+    def poll(self) -> int:
+        """
+        Rescan every directory whose modification time has changed.
+
+        This stats each directory but no files, so it is far cheaper than a
+        fresh walk. Returns the number of directories that were rescanned.
+        """
+        changed = 0
+        for directory in self.directories():
+            with self._lock:
+                known_mtime = self._dir_mtimes.get(directory)
+            if known_mtime is None:
+                continue  # Removed while this poll was running
+            try:
+                mtime = os.stat(directory).st_mtime_ns
+            except OSError:
+                mtime = None
+            if mtime != known_mtime:
+                for subdir in self.rescan_directory(directory):
+                    self.scan_tree(subdir)
+                changed += 1
+        return changed
+
+
+class PollingMonitor:
+    """Keep a SourceIndex current by polling directory modification times."""
+
+    name = "polling"
+
+    def __init__(self, index: SourceIndex, interval: float = WATCH_POLL_INTERVAL):
+        self.index = index
+        self.interval = interval
+        self._last_poll = time.monotonic()
+
+    def process(self, timeout: float) -> None:
+        """Wait up to timeout seconds, polling the source whenever the interval has passed."""
+        time.sleep(timeout)
+        if time.monotonic() - self._last_poll >= self.interval:
+            self._last_poll = time.monotonic()
+            self.index.poll()
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyMonitor:
+    """
+    Keep a SourceIndex current from Linux inotify change notifications.
+
+    Each indexed directory gets its own watch. Events update single files or
+    rescan single directories. New directories are picked up after each
+    batch of events. If the kernel event queue overflows, the monitor falls
+    back to a full poll(). A directory that cannot be watched (for example
+    when fs.inotify.max_user_watches is used up, or on some network mounts)
+    is reported through log, and from then on the whole index is polled
+    every WATCH_POLL_INTERVAL seconds. Otherwise it is still polled every
+    INOTIFY_SAFETY_POLL_INTERVAL seconds in case an event was missed.
+    """
+
+    name = "inotify"
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ONLYDIR = 0x01000000
+    IN_ISDIR = 0x40000000
+    IN_CLOEXEC = 0x00080000
+
+    WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE |
+                  IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+
+    EVENT_HEADER = struct.Struct("iIII")
+
+    def __init__(self, index: SourceIndex, log: Optional[Callable[[str], None]] = None):
+        import ctypes
+        import ctypes.util
+
+        self.index = index
+        self._log = log
+        self._get_errno = ctypes.get_errno
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = self._libc.inotify_init1(self.IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._watches = {}   # watch descriptor -> directory
+        self._watched = {}   # directory -> watch descriptor
+        self._unwatched = set()   # directories whose watch could not be added
+        self._last_poll = time.monotonic()
+        self._sync_watches()
+
+    @property
+    def poll_interval(self) -> float:
+        """Seconds between full polls: short while any directory is unwatched."""
+        return WATCH_POLL_INTERVAL if self._unwatched else INOTIFY_SAFETY_POLL_INTERVAL
+
+    def _sync_watches(self, rescan_new: bool = False) -> None:
+        """
+        Add watches for newly indexed directories and drop those for removed ones.
+
+        With rescan_new, each newly watched directory is listed again so files
+        created between the scan and the watch being added are not missed.
+        """
+        while True:
+            directories = set(self.index.directories())
+            for directory in set(self._watched) - directories:
+                self._libc.inotify_rm_watch(self._fd, self._watched.pop(directory))
+            self._unwatched &= directories
+            added = []
+            for directory in directories - set(self._watched) - self._unwatched:
+                wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), self.WATCH_MASK)
+                if wd < 0:
+                    self._watch_failed(directory, self._get_errno())
+                    continue
+                self._watches[wd] = directory
+                self._watched[directory] = wd
+                added.append(directory)
+            if not rescan_new or not added:
+                return
+            for directory in added:
+                for subdir in self.index.rescan_directory(directory):
+                    self.index.scan_tree(subdir)
+
+    def _watch_failed(self, directory: str, errno: int) -> None:
+        """Remember a directory that could not be watched so polling covers it instead."""
+        if self._log:
+            if not self._unwatched:
+                self._log(f"Falling back to polling every {WATCH_POLL_INTERVAL:g}s "
+                          f"for folders that cannot be watched.")
+            self._log(f"Could not watch '{directory}' for changes: {os.strerror(errno)} (errno {errno})")
+        self._unwatched.add(directory)
+
+    def process(self, timeout: float) -> None:
+        """Wait up to timeout seconds for change notifications and apply them to the index."""
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if readable:
+            self._apply_events(os.read(self._fd, 64 * 1024))
+        if time.monotonic() - self._last_poll >= self.poll_interval:
+            self._last_poll = time.monotonic()
+            self.index.poll()
+            self._sync_watches(rescan_new=True)
+
+    def _apply_events(self, data: bytes) -> None:
+        """Apply one buffer of raw inotify events to the index."""
+        offset = 0
+        while offset + self.EVENT_HEADER.size <= len(data):
+            wd, mask, _, name_len = self.EVENT_HEADER.unpack_from(data, offset)
+            offset += self.EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + name_len].rstrip(b"\0"))
+            offset += name_len
+
+            if mask & self.IN_Q_OVERFLOW:
+                self.index.poll()
+                continue
+            if mask & self.IN_IGNORED:
+                directory = self._watches.pop(wd, None)
+                if directory is not None and self._watched.get(directory) == wd:
+                    del self._watched[directory]
+                continue
+
+            directory = self._watches.get(wd)
+            if directory is None:
+                continue
+            if mask & (self.IN_DELETE_SELF | self.IN_MOVE_SELF):
+                self.index.remove_tree(directory)
+                continue
+            if not name:
+                continue
+
+            path = os.path.join(directory, name)
+            if mask & self.IN_ISDIR:
+                if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                    self.index.scan_tree(path)
+                else:
+                    self.index.remove_tree(path)
+            elif mask & (self.IN_DELETE | self.IN_MOVED_FROM):
+                self.index.remove_file(path)
+            else:
+                self.index.update_file(path)
+
+        self._sync_watches(rescan_new=True)
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def create_source_monitor(index: SourceIndex, log: Optional[Callable[[str], None]] = None):
+    """Return an inotify monitor for the index when the platform supports it, else a polling one."""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyMonitor(index, log)
+        except (OSError, AttributeError):
+            pass
+    return PollingMonitor(index)
+
+
+def list_destination_folder(directory: str) -> Dict[str, Tuple[str, int]]:
+    """
+    List the files directly inside a delivery folder for reconcile().
+
+    Only the top level is listed, matching how files are copied. Returns
+    {normalized name: (name, size)}.
+    """
+    files = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_file():
+                files[os.path.normcase(entry.name)] = (entry.name, entry.stat().st_size)
+    return files
+
+
+def list_archive_members(volumes: List[str]) -> Dict[str, Tuple[str, int]]:
+    """
+    List the files stored in a zip or tar delivery, across all of its volumes, for reconcile().
+
+    Sizes are the original (uncompressed) file sizes. Returns
+    {normalized name: (name, size)}.
+    """
+    files = {}
+    for volume in volumes:
+        if str(volume).lower().endswith(".zip"):
+            with zipfile.ZipFile(volume) as archive:
+                members = [(info.filename, info.file_size)
+                           for info in archive.infolist() if not info.is_dir()]
+        else:
+            with tarfile.open(volume) as archive:
+                members = [(info.name, info.size) for info in archive.getmembers() if info.isfile()]
+        for name, size in members:
+            files[os.path.normcase(name)] = (name, size)
+    return files
+
+
+def reconcile(reference_names: List[str], source_index: SourceIndex,
+              dest_files: Dict[str, Tuple[str, int]]
+              ) -> List[Tuple[str, str, str, Optional[int], Optional[int]]]:
+    """
+    Compare a reference list against the source index and a destination listing.
+
+    dest_files comes from list_destination_folder() or list_archive_members(),
+    so every comparison is a dictionary lookup and this stays fast for very
+    large lists. Returns rows of
+    (status, file name, source path, source size, destination size) for
+    every file that is missing, has a different size, or is extra in the
+    destination. Files that match are not reported, and neither are files
+    that were delivered but have since gone from the source.
+    """
+    rows = []
+    referenced = set()
+    for filename in dict.fromkeys(reference_names):
+        key = os.path.normcase(filename)
+        referenced.add(key)
+        source = source_index.lookup(filename)
+        dest = dest_files.get(key)
+        source_path, source_size = source if source else ("", None)
+        dest_size = dest[1] if dest else None
+
+        if source is None:
+            if dest is None:
+                rows.append(("missing_from_source", filename, "", None, None))
+        elif dest is None:
+            rows.append(("missing_from_destination", filename, source_path, source_size, None))
+        elif source_size != dest_size:
+            rows.append(("size_mismatch", filename, source_path, source_size, dest_size))
+
+    for key, (name, size) in dest_files.items():
+        if key not in referenced:
+            rows.append(("extra_in_destination", name, "", None, size))
+
+    rows.sort(key=lambda row: (RECONCILE_STATUSES.index(row[0]), row[1].lower()))
+    return rows
+
+
+def write_reconciliation_csv(rows: List[Tuple[str, str, str, Optional[int], Optional[int]]],
+                             csv_path: str) -> None:
+    """Write reconciliation rows to a CSV file with a header line."""
+    with open(csv_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["status", "file_name", "source_path", "source_size", "destination_size"])
+        for status, filename, source_path, source_size, dest_size in rows:
+            writer.writerow([status, filename, source_path,
+                             "" if source_size is None else source_size,
+                             "" if dest_size is None else dest_size])
+
+
+class CopyPlan:
+    """Totals and free-space figures for a copy job, computed before any bytes are written."""
+
+    def __init__(self, entries: List[Tuple[str, str, int]], dest_dir: str,
+                 reclaim_existing: bool = True):
+        self.entries = entries
+        self.dest_dir = dest_dir
+        self.total_files = len(entries)
+        self.total_bytes = sum(size for _, _, size in entries)
+
+        # Files that will be overwritten give their space back to the copy
+        self.reclaimed_bytes = 0
+        for filename, _, _ in (entries if reclaim_existing else []):
+            try:
+                self.reclaimed_bytes += (Path(dest_dir) / filename).stat().st_size
+            except OSError:
+                pass
+
+        self.free_bytes = shutil.disk_usage(self._existing_ancestor(dest_dir)).free
+
+    @staticmethod
+    def _existing_ancestor(path: str) -> str:
+        """Return the nearest existing directory for a path that may not exist yet."""
+        current = Path(path).absolute()
+        while not current.exists() and current != current.parent:
+            current = current.parent
+        return str(current)
+
+    @property
+    def required_bytes(self) -> int:
+        """Bytes of new space the destination needs to hold the copy."""
+        return max(self.total_bytes - self.reclaimed_bytes, 0)
+
+    @property
+    def has_enough_space(self) -> bool:
+        return self.required_bytes <= self.free_bytes
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled at a fixed rate per second.
+
+    A rate of 0 means unlimited. The bucket holds at most one second worth of
+    tokens; a request larger than that is allowed to drive the balance
+    negative, so later callers wait until the debt has been paid back and the
+    long-run average still matches the rate.
+    """
+
+    def __init__(self, rate: float = 0):
+        self._check_rate(rate)
+        self._lock = threading.Lock()
+        self._rate = rate
+        self._tokens = rate
+        self._last_refill = time.monotonic()
+
+    @staticmethod
+    def _check_rate(rate: float) -> None:
+        if not math.isfinite(rate) or rate < 0:
+            raise ValueError(f"Rate must be a finite number of at least 0, not {rate!r}")
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    def set_rate(self, rate: float) -> None:
+        """Change the refill rate; takes effect for callers already waiting."""
+        self._check_rate(rate)
+        with self._lock:
+            self._refill()
+            self._rate = rate
+            self._tokens = min(self._tokens, rate)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self._tokens + (now - self._last_refill) * self._rate, self._rate)
+        self._last_refill = now
+
+    def acquire(self, amount: float, cancel: Optional[threading.Event] = None) -> bool:
+        """
+        Block until amount tokens can be taken from the bucket.
+
+        Returns False without taking any tokens if cancel is set while waiting.
+        """
+        while True:
+            if cancel is not None and cancel.is_set():
+                return False
+            with self._lock:
+                if self._rate <= 0:
+                    return True
+                self._refill()
+                needed = min(amount, self._rate)
+                if self._tokens >= needed:
+                    self._tokens -= amount
+                    return True
+                delay = (needed - self._tokens) / self._rate
+            time.sleep(min(delay, RATE_LIMIT_MAX_SLEEP))
+
+
+class RateLimiter:
+    """Bandwidth (bytes/s) and file-rate (files/s) limits shared by all copy workers."""
+
+    def __init__(self, bytes_per_second: float = 0, files_per_second: float = 0):
+        self.bytes = TokenBucket(bytes_per_second)
+        self.files = TokenBucket(files_per_second)
+
+    @property
+    def is_limited(self) -> bool:
+        return self.bytes.rate > 0 or self.files.rate > 0
+
+    def describe(self) -> str:
+        """Human readable summary of the active limits."""
+        limits = []
+        if self.bytes.rate > 0:
+            limits.append(f"{format_bytes(self.bytes.rate)}/s")
+        if self.files.rate > 0:
+            limits.append(f"{self.files.rate:g} files/s")
+        return ", ".join(limits) if limits else "unlimited"
+
+
+class CopyCancelled(Exception):
+    """Raised when a copy is stopped part way through because its job was cancelled."""
+
+
+def stream_copy(src, dst, on_progress: Optional[Callable[[int], None]] = None,
+                buffer_size: int = COPY_BUFFER_SIZE,
+                limiter: Optional[RateLimiter] = None,
+                cancel: Optional[threading.Event] = None) -> int:
+    """
+    Copy everything from one open binary file object to another.
+
+    Calls on_progress(bytes_written) after every buffer. When a limiter is
+    given, each buffer waits for bandwidth before it is written. Raises
+    CopyCancelled as soon as cancel is set.
+    Returns the number of bytes copied.
+    """
+    copied = 0
+    buffer = bytearray(buffer_size)
+    view = memoryview(buffer)
+    while True:
+        chunk_size = buffer_size
+        if limiter and limiter.bytes.rate > 0:
+            # Smaller writes keep a throttled copy smooth instead of bursting a whole buffer
+            chunk_size = max(min(buffer_size, int(limiter.bytes.rate * RATE_LIMIT_MAX_SLEEP)),
+                             MIN_THROTTLED_CHUNK_SIZE)
+        if cancel is not None and cancel.is_set():
+            raise CopyCancelled()
+        read = src.readinto(view[:chunk_size])
+        if not read:
+            break
+        if limiter and not limiter.bytes.acquire(read, cancel):
+            raise CopyCancelled()
+        dst.write(view[:read])
+        copied += read
+        if on_progress:
+            on_progress(read)
+    return copied
+
+
+def copy_file_with_progress(source_path: str, dest_path: str,
+                            on_progress: Optional[Callable[[int], None]] = None,
+                            buffer_size: int = COPY_BUFFER_SIZE,
+                            limiter: Optional[RateLimiter] = None,
+                            cancel: Optional[threading.Event] = None) -> int:
+    """
+    Copy a file's contents and metadata, reporting bytes written as it goes.
+
+    Behaves like shutil.copy2() but calls on_progress(bytes_written) after
+    every buffer so large files move the progress bar smoothly. If cancel
+    is set part way through, the partial copy is deleted and CopyCancelled
+    is raised.
+    Returns the number of bytes copied.
+    """
+    try:
+        with open(source_path, 'rb') as src, open(dest_path, 'wb') as dst:
+            copied = stream_copy(src, dst, on_progress, buffer_size, limiter, cancel)
+    except CopyCancelled:
+        try:
+            os.remove(dest_path)
+        except OSError:
+            pass
+        raise
+    shutil.copystat(source_path, dest_path)
+    return copied
+
+
+class _ProgressReader:
+    """Read-only file wrapper that throttles and reports reads made by library code."""
+
+    def __init__(self, fileobj, on_progress: Optional[Callable[[int], None]] = None,
+                 limiter: Optional[RateLimiter] = None):
+        self._fileobj = fileobj
+        self._on_progress = on_progress
+        self._limiter = limiter
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._fileobj.read(size)
+        if data:
+            if self._limiter:
+                self._limiter.bytes.acquire(len(data))
+            if self._on_progress:
+                self._on_progress(len(data))
+        return data
+
+
+class ArchiveEntryError(Exception):
+    """
+    A file could not be added to an archive.
+
+    Either the source could not be opened, or it failed part way through.
+    In the second case the partly written entry has already been cut off
+    the end of the volume, so the archive never holds a truncated entry.
+    """
+
+    def __init__(self, arcname: str, error: Exception):
+        super().__init__(str(error))
+        self.arcname = arcname
+        self.error = error
+
+
+class ArchiveWriter:
+    """
+    Stream files straight into a zip or tar archive, optionally split into volumes.
+
+    Already-compressed media (see STORED_EXTENSIONS) is stored as-is in zip
+    archives while everything else is deflated. Tar archives are written
+    uncompressed, since tar compression applies to the whole stream and
+    would waste time re-compressing media. When volume_size is set, each
+    volume is a complete archive of its own (name.part001.zip,
+    name.part002.zip, ...) holding at most volume_size bytes of file data,
+    except that a single file larger than volume_size gets a volume to itself.
+
+    Volumes are created exclusively and never overwrite an existing file;
+    use existing_volumes() to find and clear an earlier delivery first.
+    """
+
+    def __init__(self, dest_dir: str, name: str, archive_format: str, volume_size: int = 0):
+        if archive_format not in ("zip", "tar"):
+            raise ValueError(f"Unsupported archive format: {archive_format}")
+        self.dest_dir = dest_dir
+        self.name = name
+        self.archive_format = archive_format
+        self.volume_size = volume_size
+        self.volumes = []
+        self._archive = None
+        self._entry_count = 0    # files in the current volume
+        self._volume_bytes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def existing_volumes(self) -> List[Path]:
+        """Archives in the destination from an earlier delivery with this name, in any layout."""
+        pattern = re.compile(re.escape(self.name) + r"(\.part\d{3,})?\." +
+                             re.escape(self.archive_format) + "$", re.IGNORECASE)
+        try:
+            with os.scandir(self.dest_dir) as entries:
+                return sorted(Path(entry.path) for entry in entries
+                              if entry.is_file() and pattern.match(entry.name))
+        except FileNotFoundError:
+            return []
+
+    def _next_volume_path(self) -> Path:
+        if self.volume_size:
+            return Path(self.dest_dir) / f"{self.name}.part{len(self.volumes) + 1:03d}.{self.archive_format}"
+        return Path(self.dest_dir) / f"{self.name}.{self.archive_format}"
+
+    def _open_volume(self, path: Path) -> None:
+        if self.archive_format == "zip":
+            self._archive = zipfile.ZipFile(path, 'x', zipfile.ZIP_DEFLATED)
+        else:
+            self._archive = tarfile.open(path, 'x')
+        self._entry_count = 0
+        self._volume_bytes = 0
+
+    def _open_next_volume(self) -> None:
+        self.close()
+        path = self._next_volume_path()
+        self._open_volume(path)
+        self.volumes.append(str(path))
+
+    def _write_entry(self, arcname: str, source_path: str, source, size: int,
+                     on_progress: Optional[Callable[[int], None]] = None,
+                     limiter: Optional[RateLimiter] = None) -> None:
+        if self.archive_format == "zip":
+            zinfo = zipfile.ZipInfo.from_file(source_path, arcname)
+            if Path(arcname).suffix.lower() in STORED_EXTENSIONS:
+                zinfo.compress_type = zipfile.ZIP_STORED
+            else:
+                zinfo.compress_type = zipfile.ZIP_DEFLATED
+            with self._archive.open(zinfo, 'w', force_zip64=size >= zipfile.ZIP64_LIMIT) as dst:
+                stream_copy(source, dst, on_progress, COPY_BUFFER_SIZE, limiter)
+        else:
+            tarinfo = self._archive.gettarinfo(source_path, arcname)
+            self._archive.addfile(tarinfo, _ProgressReader(source, on_progress, limiter))
+
+    def _end_offset(self) -> int:
+        """Position in the current volume where the next entry will start."""
+        if self.archive_format == "zip":
+            return self._archive.start_dir
+        return self._archive.offset
+
+    def _roll_back(self, offset: int) -> None:
+        """
+        Cut the current volume back to offset, dropping a partly written entry.
+
+        Neither zipfile nor tarfile can remove an entry, so the file is
+        truncated and their bookkeeping is reset to match. Only the failed
+        entry is touched; nothing already in the volume is written again.
+        """
+        if self.archive_format == "zip":
+            archive = self._archive
+            archive._writing = False
+            archive.filelist = [zinfo for zinfo in archive.filelist if zinfo.header_offset < offset]
+            archive.NameToInfo = {zinfo.filename: zinfo for zinfo in archive.filelist}
+            archive.start_dir = offset
+            fileobj = archive.fp
+        else:
+            self._archive.offset = offset
+            fileobj = self._archive.fileobj
+        fileobj.seek(offset)
+        fileobj.truncate()
+
+    def add(self, arcname: str, source_path: str, size: int,
+            on_progress: Optional[Callable[[int], None]] = None,
+            limiter: Optional[RateLimiter] = None) -> None:
+        """
+        Append one file to the current volume, starting a new volume if it would overflow.
+
+        When a limiter is given, each file waits for the files/s limit as
+        well as the bandwidth limit. Raises ArchiveEntryError if this file
+        could not be archived; the archive is left without it and later
+        files can still be added. Any other exception means the archive
+        itself could not be written.
+        """
+        if limiter:
+            limiter.files.acquire(1)
+        try:
+            source = open(source_path, 'rb')
+        except OSError as e:
+            raise ArchiveEntryError(arcname, e) from e
+        try:
+            if self._archive is None or (self.volume_size and self._volume_bytes and
+                                         self._volume_bytes + size > self.volume_size):
+                self._open_next_volume()
+            offset = self._end_offset()
+            try:
+                self._write_entry(arcname, source_path, source, size, on_progress, limiter)
+            except Exception as e:
+                self._roll_back(offset)
+                raise ArchiveEntryError(arcname, e) from e
+            self._entry_count += 1
+            self._volume_bytes += size
+        finally:
+            source.close()
+
+    def close(self) -> None:
+        """Finish the current volume, removing it if every file in it failed."""
+        if self._archive is not None:
+            self._archive.close()
+            self._archive = None
+            if not self._entry_count:
+                os.remove(self.volumes.pop())
+
+
+class CopyLane:
+    """A pool of copy workers dedicated to one size class of files."""
+
+    def __init__(self, name: str, workers: int, buffer_size: int):
+        self.name = name
+        self.workers = workers
+        self.buffer_size = buffer_size
+        self.entries = []
+        self.copied_files = 0
+        self.copied_bytes = 0
+        self.errors = 0
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None or self.finished_at is None:
+            return 0.0
+        return self.finished_at - self.started_at
+
+    def summary(self) -> str:
+        """One-line description of what this lane did, for the run report."""
+        rate = self.copied_bytes / self.elapsed if self.elapsed > 0 else 0
+        return (f"{self.name} lane ({self.workers} workers, {format_bytes(self.buffer_size)} buffer): "
+                f"{self.copied_files} files, {format_bytes(self.copied_bytes)} "
+                f"in {format_duration(self.elapsed)} ({format_bytes(rate)}/s), {self.errors} errors")
+
+
+class CopyScheduler:
+    """
+    Copy files through separate small-file and large-file lanes that run together.
+
+    Small files go through a high-concurrency lane to hide per-file overhead,
+    while large files stream through a few workers with big buffers. Running
+    both at once keeps the destination busy for the whole job. Workers report
+    finished files through an event queue so the caller can update the UI
+    from its own thread.
+
+    Worker threads are not daemon threads, so the interpreter waits for them
+    on exit; call cancel() when the application closes to drop queued files
+    and stop the ones in progress.
+    """
+
+    def __init__(self, entries: List[Tuple[str, str, int]], dest_dir: str,
+                 large_file_threshold: int = LARGE_FILE_THRESHOLD,
+                 limiter: Optional[RateLimiter] = None):
+        self.dest_dir = dest_dir
+        self.limiter = limiter
+        self.small_lane = CopyLane("Small-file", SMALL_FILE_WORKERS, COPY_BUFFER_SIZE)
+        self.large_lane = CopyLane("Large-file", LARGE_FILE_WORKERS, LARGE_FILE_BUFFER_SIZE)
+        for entry in entries:
+            lane = self.large_lane if entry[2] >= large_file_threshold else self.small_lane
+            lane.entries.append(entry)
+
+        # Start the biggest large files first so one of them does not finish alone at the end
+        self.large_lane.entries.sort(key=lambda entry: entry[2], reverse=True)
+        self.small_lane.entries.sort(key=lambda entry: entry[2])
+
+        self.events = queue.Queue()
+        self.copied_bytes = 0
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._executors = []
+        self._futures = []
+
+    @property
+    def lanes(self) -> List[CopyLane]:
+        return [self.small_lane, self.large_lane]
+
+    def start(self) -> None:
+        """Submit every file to its lane; both lanes begin copying immediately."""
+        for lane in self.lanes:
+            if not lane.entries:
+                continue
+            executor = ThreadPoolExecutor(max_workers=lane.workers)
+            self._executors.append(executor)
+            for entry in lane.entries:
+                self._futures.append(executor.submit(self._copy_entry, lane, entry))
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def cancel(self) -> None:
+        """Drop every queued file and stop the copies in progress at their next buffer."""
+        self._cancel.set()
+        # Cancel queued files one by one; shutdown(cancel_futures=True) needs Python 3.9
+        for future in self._futures:
+            future.cancel()
+        for executor in self._executors:
+            executor.shutdown(wait=False)
+
+    def wait(self, timeout: float) -> bool:
+        """Wait up to timeout seconds; return True once every file has been handled."""
+        _, not_done = wait(self._futures, timeout=timeout)
+        if not_done:
+            return False
+        for executor in self._executors:
+            executor.shutdown(wait=True)
+        return True
+
+    def _copy_entry(self, lane: CopyLane, entry: Tuple[str, str, int]) -> None:
+        """Worker body: copy one file and report the outcome on the event queue."""
+        filename, source_path, size = entry
+        dest_path = Path(self.dest_dir) / filename
+        copied = 0
+
+        def on_chunk(num_bytes: int):
+            nonlocal copied
+            copied += num_bytes
+            with self._lock:
+                self.copied_bytes += num_bytes
+
+        if self._cancel.is_set():
+            return
+        if self.limiter and not self.limiter.files.acquire(1, self._cancel):
+            return
+
+        with self._lock:
+            if lane.started_at is None:
+                lane.started_at = time.monotonic()
+
+        overwritten = dest_path.exists()
+        error = None
+        try:
+            copy_file_with_progress(source_path, str(dest_path), on_chunk,
+                                    lane.buffer_size, self.limiter, self._cancel)
+        except Exception as e:
+            error = e
+
+        with self._lock:
+            if error is None:
+                lane.copied_files += 1
+                lane.copied_bytes += copied
+            else:
+                # Take back the bytes of the partial copy so progress stays accurate
+                self.copied_bytes -= copied
+                lane.errors += 1
+            lane.finished_at = time.monotonic()
+
+        self.events.put((filename, size, overwritten, error))
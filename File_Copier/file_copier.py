@@ -7,24 +7,61 @@ based on a reference file containing the list of files to copy.
 
 Features:
 - Modern GUI interface with file/folder selection buttons
-- Progress bar showing copy completion percentage
-- Searches for files in source directory and subdirectories
+- Byte-weighted progress bar with transfer rate and ETA
+- Indexes the source directory and subdirectories in a single pass
+- Pre-flight copy plan with size totals and a destination free-space check
+- Concurrent small-file and large-file copy lanes
+- Bandwidth and file-rate throttling, adjustable while a copy runs
+- Optional single-pass output into zip or tar archives, split into volumes
+- Watch folder mode that copies each dropped reference file using a warm source index
+- Reconciliation report (CSV) of missing, size-mismatched and extra files
 - Handles file conflicts and errors gracefully
 - Detailed logging in the application window
 - Portable - no external dependencies required
+- Fast startup - the copy engine (copy_engine.py) is only loaded when first needed
 """
 
+import math
 import os
-import shutil
+import queue
 import sys
 import threading
 import time
-import zipfile
 from pathlib import Path
-from typing import List, Tuple, Optional
+from types import ModuleType
+from typing import TYPE_CHECKING, List, Tuple
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 
+if TYPE_CHECKING:
+    from copy_engine import SourceIndex
+
+
+# Output choices offered in the copier tab, mapped to archive formats (None = plain folder)
+OUTPUT_MODES = {
+    "Folder": None,
+    "Zip archive": "zip",
+    "Tar archive": "tar",
+}
+
+# The copy engine module, loaded on first use by load_copy_engine()
+_engine = None
+
+
+def load_copy_engine() -> ModuleType:
+    """
+    Import the copy engine the first time it is needed.
+
+    Keeping it (and the modules it depends on) out of the startup imports
+    lets the window appear sooner. Job threads call this once and pass the
+    module down to the methods they run.
+    """
+    global _engine
+    if _engine is None:
+        import copy_engine
+        _engine = copy_engine
+    return _engine
+
 
 class StarzShotsApp:
     def __init__(self):
@@ -34,9 +71,20 @@ class StarzShotsApp:
         self.reference_file = ""
         self.files_to_copy = []
         self.found_files = {}
+        self.found_sizes = {}
+        self.copy_plan = None
         self.copied_count = 0
         self.total_files = 0
         self.is_copying = False
+        self.rate_limiter = None  # Created with the copy engine on first use
+        self.archive_format = None
+        self.volume_size = 0
+
+        # Watch Folder variables
+        self.watch_source_dir = ""
+        self.watch_dest_dir = ""
+        self.drop_dir = ""
+        self.is_watching = False
 
         # Reference Builder variables
         self.zip_files = []
@@ -49,6 +97,11 @@ class StarzShotsApp:
         self.root.geometry("900x700")
         self.root.resizable(True, True)
 
+        # Copy jobs running right now, so closing the window can stop them
+        self.active_schedulers = set()
+        self.is_closing = False
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
         # Configure style
         self.style = ttk.Style()
         self.style.theme_use('clam')
@@ -79,6 +132,7 @@ class StarzShotsApp:
         # Create tabs
         self.setup_file_copier_tab()
         self.setup_reference_builder_tab()
+        self.setup_watch_folder_tab()
 
     def setup_file_copier_tab(self):
         """Setup the File Copier tab."""
@@ -88,7 +142,7 @@ class StarzShotsApp:
 
         # Configure grid weights
         copier_frame.columnconfigure(1, weight=1)
-        copier_frame.rowconfigure(5, weight=1)
+        copier_frame.rowconfigure(7, weight=1)
 
         # Source directory selection
         ttk.Label(copier_frame, text="Source Directory:", font=('Arial', 10, 'bold')).grid(
@@ -117,20 +171,52 @@ class StarzShotsApp:
         ttk.Button(copier_frame, text="Browse", command=self.browse_reference_file).grid(
             row=2, column=2, pady=5)
 
+        # Output mode: plain folder or a delivery archive written in one pass
+        ttk.Label(copier_frame, text="Output:", font=('Arial', 10, 'bold')).grid(
+            row=3, column=0, sticky=tk.W, pady=5)
+        output_frame = ttk.Frame(copier_frame)
+        output_frame.grid(row=3, column=1, columnspan=2, sticky=tk.W, padx=(10, 5), pady=5)
+        self.output_mode_var = tk.StringVar(value="Folder")
+        ttk.Combobox(output_frame, textvariable=self.output_mode_var, values=list(OUTPUT_MODES),
+                     state="readonly", width=14).pack(side=tk.LEFT, padx=(0, 15))
+        self.volume_size_var = tk.StringVar(value="0")
+        ttk.Label(output_frame, text="Volume size (MB):").pack(side=tk.LEFT)
+        ttk.Entry(output_frame, textvariable=self.volume_size_var, width=8).pack(side=tk.LEFT, padx=(5, 15))
+        ttk.Label(output_frame, text="(0 = single archive)").pack(side=tk.LEFT)
+
+        # Throttle settings (0 = unlimited); changes apply to a running copy immediately
+        ttk.Label(copier_frame, text="Throttle:", font=('Arial', 10, 'bold')).grid(
+            row=4, column=0, sticky=tk.W, pady=5)
+        throttle_frame = ttk.Frame(copier_frame)
+        throttle_frame.grid(row=4, column=1, columnspan=2, sticky=tk.W, padx=(10, 5), pady=5)
+        self.limit_mbps_var = tk.StringVar(value="0")
+        self.limit_fps_var = tk.StringVar(value="0")
+        ttk.Label(throttle_frame, text="MB/s:").pack(side=tk.LEFT)
+        ttk.Entry(throttle_frame, textvariable=self.limit_mbps_var, width=8).pack(side=tk.LEFT, padx=(5, 15))
+        ttk.Label(throttle_frame, text="Files/s:").pack(side=tk.LEFT)
+        ttk.Entry(throttle_frame, textvariable=self.limit_fps_var, width=8).pack(side=tk.LEFT, padx=(5, 15))
+        ttk.Label(throttle_frame, text="(0 = unlimited)").pack(side=tk.LEFT)
+        self.limit_mbps_var.trace_add("write", self.apply_rate_limits)
+        self.limit_fps_var.trace_add("write", self.apply_rate_limits)
+
         # Control buttons frame
         button_frame = ttk.Frame(copier_frame)
-        button_frame.grid(row=3, column=0, columnspan=3, pady=20)
+        button_frame.grid(row=5, column=0, columnspan=3, pady=20)
 
         self.start_button = ttk.Button(button_frame, text="Start Copying",
                                       command=self.start_copy_process, style='Accent.TButton')
         self.start_button.pack(side=tk.LEFT, padx=5)
 
+        self.reconcile_button = ttk.Button(button_frame, text="Reconciliation Report",
+                                           command=self.start_reconcile_process)
+        self.reconcile_button.pack(side=tk.LEFT, padx=5)
+
         self.clear_button = ttk.Button(button_frame, text="Clear All", command=self.clear_copier_fields)
         self.clear_button.pack(side=tk.LEFT, padx=5)
 
         # Progress frame
         progress_frame = ttk.LabelFrame(copier_frame, text="Progress", padding="10")
-        progress_frame.grid(row=4, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=10)
+        progress_frame.grid(row=6, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=10)
         progress_frame.columnconfigure(0, weight=1)
 
         # Progress bar
@@ -145,7 +231,7 @@ class StarzShotsApp:
 
         # Log frame
         log_frame = ttk.LabelFrame(copier_frame, text="Log", padding="10")
-        log_frame.grid(row=5, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S), pady=10)
+        log_frame.grid(row=7, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S), pady=10)
         log_frame.columnconfigure(0, weight=1)
         log_frame.rowconfigure(0, weight=1)
 
@@ -226,6 +312,82 @@ class StarzShotsApp:
         self.builder_log_text = scrolledtext.ScrolledText(builder_log_frame, height=12, width=80)
         self.builder_log_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
 
+    def setup_watch_folder_tab(self):
+        """Setup the Watch Folder tab."""
+        # Create watch folder frame
+        watch_frame = ttk.Frame(self.notebook, padding="10")
+        self.notebook.add(watch_frame, text="Watch Folder")
+
+        # Configure grid weights
+        watch_frame.columnconfigure(1, weight=1)
+        watch_frame.rowconfigure(6, weight=1)
+
+        # Header
+        header_label = ttk.Label(watch_frame, text="** Copy every reference file dropped into a folder **",
+                                 font=('Arial', 13, 'bold'))
+        header_label.grid(row=0, column=0, columnspan=3, pady=(0, 20))
+
+        # Source directory selection
+        ttk.Label(watch_frame, text="Source Directory:", font=('Arial', 10, 'bold')).grid(
+            row=1, column=0, sticky=tk.W, pady=5)
+        self.watch_source_var = tk.StringVar()
+        ttk.Entry(watch_frame, textvariable=self.watch_source_var, width=50).grid(
+            row=1, column=1, sticky=(tk.W, tk.E), padx=(10, 5), pady=5)
+        ttk.Button(watch_frame, text="Browse", command=self.browse_watch_source_dir).grid(
+            row=1, column=2, pady=5)
+
+        # Destination directory selection
+        ttk.Label(watch_frame, text="Destination Directory:", font=('Arial', 10, 'bold')).grid(
+            row=2, column=0, sticky=tk.W, pady=5)
+        self.watch_dest_var = tk.StringVar()
+        ttk.Entry(watch_frame, textvariable=self.watch_dest_var, width=50).grid(
+            row=2, column=1, sticky=(tk.W, tk.E), padx=(10, 5), pady=5)
+        ttk.Button(watch_frame, text="Browse", command=self.browse_watch_dest_dir).grid(
+            row=2, column=2, pady=5)
+
+        # Drop folder selection
+        ttk.Label(watch_frame, text="Drop Folder:", font=('Arial', 10, 'bold')).grid(
+            row=3, column=0, sticky=tk.W, pady=5)
+        self.drop_var = tk.StringVar()
+        ttk.Entry(watch_frame, textvariable=self.drop_var, width=50).grid(
+            row=3, column=1, sticky=(tk.W, tk.E), padx=(10, 5), pady=5)
+        ttk.Button(watch_frame, text="Browse", command=self.browse_drop_dir).grid(
+            row=3, column=2, pady=5)
+
+        # Control buttons frame for watching
+        watch_button_frame = ttk.Frame(watch_frame)
+        watch_button_frame.grid(row=4, column=0, columnspan=3, pady=20)
+
+        self.watch_button = ttk.Button(watch_button_frame, text="Start Watching",
+                                       command=self.start_watching, style='Accent.TButton')
+        self.watch_button.pack(side=tk.LEFT, padx=5)
+
+        self.stop_watch_button = ttk.Button(watch_button_frame, text="Stop Watching",
+                                            command=self.stop_watching, state='disabled')
+        self.stop_watch_button.pack(side=tk.LEFT, padx=5)
+
+        # Watch status label
+        self.watch_status_label = ttk.Label(watch_frame, text="Not watching.")
+        self.watch_status_label.grid(row=5, column=0, columnspan=3, pady=5)
+
+        # Watch log frame
+        watch_log_frame = ttk.LabelFrame(watch_frame, text="Log", padding="10")
+        watch_log_frame.grid(row=6, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S), pady=10)
+        watch_log_frame.columnconfigure(0, weight=1)
+        watch_log_frame.rowconfigure(0, weight=1)
+
+        # Watch log text area
+        self.watch_log_text = scrolledtext.ScrolledText(watch_log_frame, height=12, width=80)
+        self.watch_log_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+
+    def on_close(self):
+        """Stop any running copy or watch job and close the window."""
+        self.is_closing = True
+        self.is_watching = False
+        for scheduler in list(self.active_schedulers):
+            scheduler.cancel()
+        self.root.destroy()
+
     def log_message(self, message: str):
         """Add a message to the log area."""
         self.log_text.insert(tk.END, f"{message}\n")
@@ -238,6 +400,12 @@ class StarzShotsApp:
         self.builder_log_text.see(tk.END)
         self.root.update_idletasks()
 
+    def watch_log_message(self, message: str):
+        """Add a timestamped message to the watch folder log area."""
+        self.watch_log_text.insert(tk.END, f"{time.strftime('%H:%M:%S')}  {message}\n")
+        self.watch_log_text.see(tk.END)
+        self.root.update_idletasks()
+
     def browse_source_dir(self):
         """Browse for source directory."""
         directory = filedialog.askdirectory(title="Select Source Directory")
@@ -265,6 +433,286 @@ class StarzShotsApp:
             self.reference_file = file_path
             self.log_message(f"Reference file selected: {file_path}")
 
+    def get_rate_limiter(self):
+        """Return the shared rate limiter, loading the copy engine the first time."""
+        if self.rate_limiter is None:
+            self.rate_limiter = load_copy_engine().RateLimiter()
+            self.apply_rate_limits()
+        return self.rate_limiter
+
+    def apply_rate_limits(self, *args):
+        """Push the throttle fields into the shared rate limiter."""
+        if self.rate_limiter is None:
+            return  # Read from the fields when the first job starts
+        try:
+            mbps = float(self.limit_mbps_var.get() or 0)
+            fps = float(self.limit_fps_var.get() or 0)
+        except ValueError:
+            return  # Keep the previous limits while the user is still typing
+        if not (math.isfinite(mbps) and math.isfinite(fps)) or mbps < 0 or fps < 0:
+            return  # 'inf', 'nan' and negative limits are not usable
+
+        changed = (self.rate_limiter.bytes.rate != mbps * 1024 * 1024 or
+                   self.rate_limiter.files.rate != fps)
+        self.rate_limiter.bytes.set_rate(mbps * 1024 * 1024)
+        self.rate_limiter.files.set_rate(fps)
+        if changed and self.is_copying:
+            self.log_message(f"Throttle changed: {self.rate_limiter.describe()}")
+
+    # Watch Folder Methods
+    def browse_watch_source_dir(self):
+        """Browse for the watched source directory."""
+        directory = filedialog.askdirectory(title="Select Source Directory")
+        if directory:
+            self.watch_source_var.set(directory)
+            self.watch_source_dir = directory
+            self.watch_log_message(f"Source directory selected: {directory}")
+
+    def browse_watch_dest_dir(self):
+        """Browse for the watch folder destination directory."""
+        directory = filedialog.askdirectory(title="Select Destination Directory")
+        if directory:
+            self.watch_dest_var.set(directory)
+            self.watch_dest_dir = directory
+            self.watch_log_message(f"Destination directory selected: {directory}")
+
+    def browse_drop_dir(self):
+        """Browse for the folder reference files are dropped into."""
+        directory = filedialog.askdirectory(title="Select Drop Folder")
+        if directory:
+            self.drop_var.set(directory)
+            self.drop_dir = directory
+            self.watch_log_message(f"Drop folder selected: {directory}")
+
+    def validate_watch_inputs(self) -> bool:
+        """Validate watch folder inputs."""
+        self.watch_source_dir = self.watch_source_var.get()
+        self.watch_dest_dir = self.watch_dest_var.get()
+        self.drop_dir = self.drop_var.get()
+
+        for value, label in ((self.watch_source_dir, "source directory"),
+                             (self.watch_dest_dir, "destination directory"),
+                             (self.drop_dir, "drop folder")):
+            if not value:
+                messagebox.showerror("Error", f"Please select a {label}.")
+                return False
+
+        for value, label in ((self.watch_source_dir, "Source directory"),
+                             (self.drop_dir, "Drop folder")):
+            if not Path(value).is_dir():
+                messagebox.showerror("Error", f"{label} does not exist: {value}")
+                return False
+
+        return True
+
+    def start_watching(self):
+        """Start watching the drop folder for reference files."""
+        if not self.validate_watch_inputs():
+            return
+
+        if self.is_watching:
+            messagebox.showwarning("Warning", "Already watching the drop folder.")
+            return
+
+        self.watch_button.config(state='disabled')
+        self.stop_watch_button.config(state='normal')
+        self.is_watching = True
+        self.get_rate_limiter()
+
+        # Watch in a separate thread to prevent UI freezing
+        thread = threading.Thread(target=self.watch_folder_thread)
+        thread.daemon = True
+        thread.start()
+
+    def stop_watching(self):
+        """Ask the watch thread to stop after its current step."""
+        if self.is_watching:
+            self.is_watching = False
+            self.stop_watch_button.config(state='disabled')
+            self.watch_log_message("Stopping...")
+
+    def watch_folder_thread(self):
+        """Thread function that keeps the source index warm and processes dropped reference files."""
+        monitor = None
+        try:
+            engine = load_copy_engine()
+            self.watch_status_label.config(text="Indexing source directory...")
+            start_time = time.monotonic()
+            index = engine.SourceIndex(self.watch_source_dir)
+            index.build()
+            monitor = engine.create_source_monitor(index, self.watch_log_message)
+            self.watch_log_message(f"Indexed {len(index)} files in {len(index.directories())} folders "
+                                   f"in {engine.format_duration(time.monotonic() - start_time)}.")
+            self.watch_log_message(f"Watching source for changes using {monitor.name}.")
+            self.watch_log_message(f"Waiting for reference files in: {self.drop_dir}")
+
+            # Reference files not ready yet: path -> ((size, mtime), when that signature was first seen)
+            pending = {}
+            # Reference files left in place after a failure, skipped until they change
+            held = {}
+            while self.is_watching:
+                self.watch_status_label.config(text=f"Watching - {len(index)} files indexed.")
+                monitor.process(engine.WATCH_LOOP_INTERVAL)
+                ready = self.find_ready_reference_files(pending, held, engine.WATCH_LOOP_INTERVAL)
+                for reference_path, signature in ready:
+                    if not self.is_watching:
+                        break
+                    if not self.process_dropped_reference(engine, reference_path, index):
+                        held[reference_path] = signature
+                        self.watch_log_message("The reference file was left in the drop folder; "
+                                               "save it again to retry.")
+
+        except Exception as e:
+            if self.is_closing:
+                return  # The window is gone; watching was stopped on purpose
+            self.watch_log_message(f"Error while watching: {e}")
+            messagebox.showerror("Error", f"An error occurred while watching: {e}")
+        finally:
+            if monitor is not None:
+                monitor.close()
+            self.is_watching = False
+            if self.is_closing:
+                return
+            self.watch_status_label.config(text="Not watching.")
+            self.watch_button.config(state='normal')
+            self.stop_watch_button.config(state='disabled')
+            self.watch_log_message("Stopped watching.")
+
+    def find_ready_reference_files(self, pending: dict, held: dict,
+                                   settle_time: float) -> List[Tuple[str, tuple]]:
+        """
+        Return (path, signature) for reference files in the drop folder that are ready.
+
+        A file counts as ready once its size and modification time have
+        stayed the same for at least settle_time seconds, so half-copied
+        drops are left alone however quickly the folder is scanned.
+        Files in held are skipped until their signature changes.
+        """
+        ready = []
+        seen = {}
+        try:
+            with os.scandir(self.drop_dir) as entries:
+                for entry in entries:
+                    if not entry.is_file() or not entry.name.lower().endswith('.txt'):
+                        continue
+                    stat = entry.stat()
+                    seen[entry.path] = (stat.st_size, stat.st_mtime_ns)
+        except OSError as e:
+            self.watch_log_message(f"Error reading drop folder: {e}")
+            return ready
+
+        for path in list(held):
+            if seen.get(path) != held[path]:
+                del held[path]
+
+        now = time.monotonic()
+        for path in list(pending):
+            if path not in seen or path in held:
+                del pending[path]
+        for path, signature in sorted(seen.items()):
+            if path in held:
+                continue
+            if path not in pending or pending[path][0] != signature:
+                pending[path] = (signature, now)
+            elif now - pending[path][1] >= settle_time:
+                del pending[path]
+                ready.append((path, signature))
+        return ready
+
+    def process_dropped_reference(self, engine: ModuleType, reference_path: str,
+                                  index: "SourceIndex") -> bool:
+        """
+        Copy the files listed in one dropped reference file, then move it to 'processed'.
+
+        Returns False if the reference file had to be left in the drop folder,
+        because it could not be read, any of its files could not be copied,
+        or it could not be moved.
+        """
+        import shutil
+        name = Path(reference_path).stem
+        self.watch_log_message("-" * 50)
+        self.watch_log_message(f"New reference file: {Path(reference_path).name}")
+        start_time = time.monotonic()
+
+        try:
+            filenames = engine.parse_reference_file(reference_path)
+        except Exception as e:
+            self.watch_log_message(f"Error reading reference file: {e}")
+            return False
+
+        # Look everything up in the warm index; only matched files are stat'ed
+        entries = []
+        missing = 0
+        for filename in dict.fromkeys(filenames):
+            match = index.lookup(filename)
+            try:
+                size = os.stat(match[0]).st_size if match else None
+            except OSError:
+                size = None
+            if size is None:
+                missing += 1
+                self.watch_log_message(f"Warning: File '{filename}' not found in source directory.")
+            else:
+                entries.append((filename, match[0], size))
+
+        dest_dir = str(Path(self.watch_dest_dir) / name)
+        copied = 0
+        failed = 0
+        if entries:
+            try:
+                Path(dest_dir).mkdir(parents=True, exist_ok=True)
+                plan = engine.CopyPlan(entries, dest_dir)
+            except OSError as e:
+                self.watch_log_message(f"Error preparing destination '{dest_dir}': {e}")
+                return False
+            if not plan.has_enough_space:
+                self.watch_log_message(f"Error: Not enough free space for '{name}' "
+                                       f"(needs {engine.format_bytes(plan.required_bytes)}, "
+                                       f"{engine.format_bytes(plan.free_bytes)} free). Nothing was copied.")
+                return False
+
+            scheduler = engine.CopyScheduler(entries, dest_dir, limiter=self.rate_limiter)
+            self.active_schedulers.add(scheduler)
+            try:
+                scheduler.start()
+                while not scheduler.wait(engine.WATCH_LOOP_INTERVAL):
+                    self.watch_status_label.config(
+                        text=f"Copying '{name}'... {engine.format_bytes(scheduler.copied_bytes)} of "
+                             f"{engine.format_bytes(plan.total_bytes)}")
+            except BaseException:
+                scheduler.cancel()
+                raise
+            finally:
+                self.active_schedulers.discard(scheduler)
+            if scheduler.cancelled:
+                return False
+            while not scheduler.events.empty():
+                filename, _, _, error = scheduler.events.get_nowait()
+                if error is None:
+                    copied += 1
+                else:
+                    failed += 1
+                    self.watch_log_message(f"Error copying '{filename}': {error}")
+
+        self.watch_log_message(f"Copied {copied} of {len(filenames)} files to {dest_dir} "
+                               f"({missing} missing, {failed} failed) "
+                               f"in {engine.format_duration(time.monotonic() - start_time)}.")
+        if failed:
+            return False
+
+        # Move the reference file out of the way so it is only processed once
+        processed_dir = Path(self.drop_dir) / "processed"
+        try:
+            processed_dir.mkdir(exist_ok=True)
+            target = processed_dir / Path(reference_path).name
+            if target.exists():
+                target = processed_dir / f"{name}_{time.strftime('%Y%m%d_%H%M%S')}.txt"
+            shutil.move(reference_path, str(target))
+        except OSError as e:
+            self.watch_log_message(f"Error moving reference file to 'processed': {e}")
+            return False
+        return True
+
     # Reference Builder Methods
     def add_zip_files(self):
         """Add zip files to the list."""
@@ -364,6 +812,7 @@ class StarzShotsApp:
 
     def build_reference_file_thread(self):
         """Thread function for building reference file."""
+        import zipfile
         try:
             self.builder_log_message("Starting reference file building process...")
             self.progress_var.set(0)
@@ -467,6 +916,17 @@ class StarzShotsApp:
             messagebox.showerror("Error", f"Reference file does not exist: {self.reference_file}")
             return False
 
+        # Validate archive volume size
+        try:
+            volume_mb = float(self.volume_size_var.get() or 0)
+        except ValueError:
+            volume_mb = -1
+        if not math.isfinite(volume_mb) or volume_mb < 0:
+            messagebox.showerror("Error", "Volume size must be a number of MB (0 for a single archive).")
+            return False
+
+        self.archive_format = OUTPUT_MODES[self.output_mode_var.get()]
+        self.volume_size = int(volume_mb * 1024 * 1024)
         return True
 
     def start_copy_process(self):
@@ -481,45 +941,154 @@ class StarzShotsApp:
         # Disable start button during copying
         self.start_button.config(state='disabled')
         self.is_copying = True
+        self.get_rate_limiter()
 
         # Start copying in a separate thread to prevent UI freezing
         thread = threading.Thread(target=self.copy_files_thread)
         thread.daemon = True
         thread.start()
 
+    def start_reconcile_process(self):
+        """Ask where to save the reconciliation report and build it in the background."""
+        if not self.validate_inputs():
+            return
+
+        if not Path(self.dest_dir).is_dir():
+            messagebox.showerror("Error", f"Destination directory does not exist: {self.dest_dir}")
+            return
+
+        if self.is_copying:
+            messagebox.showwarning("Warning", "Copy operation is already in progress.")
+            return
+
+        csv_path = filedialog.asksaveasfilename(
+            title="Save Reconciliation Report",
+            defaultextension=".csv",
+            initialfile=f"{Path(self.reference_file).stem}_reconciliation.csv",
+            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
+        )
+        if not csv_path:
+            return
+
+        # Share the copy lock so a report is never taken half way through a copy
+        self.start_button.config(state='disabled')
+        self.reconcile_button.config(state='disabled')
+        self.is_copying = True
+
+        thread = threading.Thread(target=self.reconcile_thread, args=(csv_path,))
+        thread.daemon = True
+        thread.start()
+
+    def reconcile_thread(self, csv_path: str):
+        """Thread function for building the reconciliation report."""
+        try:
+            engine = load_copy_engine()
+            start_time = time.monotonic()
+            self.log_message("Building reconciliation report...")
+            self.progress_label.config(text="Indexing source directory...")
+            self.root.update_idletasks()
+
+            reference_names = engine.parse_reference_file(self.reference_file)
+            source_index = engine.SourceIndex(self.source_dir)
+            source_index.build()
+
+            dest_files = self.list_delivery(engine)
+            if dest_files is None:
+                return
+
+            self.progress_label.config(text="Comparing reference, source and destination...")
+            self.root.update_idletasks()
+            rows = engine.reconcile(reference_names, source_index, dest_files)
+            engine.write_reconciliation_csv(rows, csv_path)
+
+            counts = {status: 0 for status in engine.RECONCILE_STATUSES}
+            for row in rows:
+                counts[row[0]] += 1
+
+            self.log_message("-" * 50)
+            self.log_message(f"Reconciliation of {len(set(reference_names))} referenced files:")
+            for status in engine.RECONCILE_STATUSES:
+                self.log_message(f"  {status.replace('_', ' ').capitalize()}: {counts[status]}")
+            self.log_message(f"Report written to: {csv_path} "
+                             f"({engine.format_duration(time.monotonic() - start_time)})")
+            self.progress_label.config(text="Reconciliation report created.")
+
+            messagebox.showinfo("Success",
+                                f"Reconciliation report created!\n\n"
+                                f"Location: {csv_path}\n"
+                                f"Missing from source: {counts['missing_from_source']}\n"
+                                f"Missing from destination: {counts['missing_from_destination']}\n"
+                                f"Size mismatches: {counts['size_mismatch']}\n"
+                                f"Extra in destination: {counts['extra_in_destination']}")
+
+        except Exception as e:
+            self.log_message(f"Error building reconciliation report: {e}")
+            messagebox.showerror("Error", f"An error occurred while reconciling: {e}")
+        finally:
+            self.is_copying = False
+            self.start_button.config(state='normal')
+            self.reconcile_button.config(state='normal')
+
+    def list_delivery(self, engine: ModuleType):
+        """
+        List the delivered files for this reference file, wherever the delivery was written.
+
+        With an archive output mode the members of its volumes are listed.
+        Otherwise a '<destination>/<reference name>/' folder from the watch
+        folder is used if there is one, else the destination itself.
+        Returns None if there is no archive to reconcile against.
+        """
+        name = Path(self.reference_file).stem
+        if self.archive_format:
+            volumes = self.make_archive_writer(engine).existing_volumes()
+            if not volumes:
+                self.log_message(f"Error: No {self.archive_format} archive named '{name}' in destination.")
+                messagebox.showerror("Error", f"No {self.archive_format} archive named '{name}' was found in "
+                                              f"the destination. Set Output to match the delivery.")
+                return None
+            self.log_message(f"Reading {len(volumes)} archive volume(s): "
+                             f"{', '.join(path.name for path in volumes)}")
+            return engine.list_archive_members([str(path) for path in volumes])
+
+        delivery_dir = Path(self.dest_dir) / name
+        if not delivery_dir.is_dir():
+            delivery_dir = Path(self.dest_dir)
+        self.log_message(f"Comparing against destination folder: {delivery_dir}")
+        return engine.list_destination_folder(str(delivery_dir))
+
     def copy_files_thread(self):
         """Thread function for copying files."""
         try:
+            engine = load_copy_engine()
+
             # Read reference file
-            if not self.read_reference_file():
+            if not self.read_reference_file(engine):
                 return
 
             # Find files in source directory
-            self.find_files_in_source()
+            self.find_files_in_source(engine)
+
+            # Total up the job and make sure it fits before writing anything
+            if not self.plan_copy(engine):
+                return
 
             # Copy files
-            self.copy_files()
+            self.copy_files(engine)
 
         except Exception as e:
+            if self.is_closing:
+                return  # The window is gone; the copy was stopped on purpose
             self.log_message(f"Error during copy operation: {e}")
             messagebox.showerror("Error", f"An error occurred: {e}")
         finally:
             self.is_copying = False
-            self.start_button.config(state='normal')
+            if not self.is_closing:
+                self.start_button.config(state='normal')
 
-    def read_reference_file(self) -> bool:
+    def read_reference_file(self, engine: ModuleType) -> bool:
         """Read the reference file and extract file names."""
         try:
-            with open(self.reference_file, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-
-            # Clean up file names (remove whitespace and empty lines)
-            self.files_to_copy = []
-            for line in lines:
-                filename = line.strip()
-                if filename and not filename.startswith('#'):  # Skip empty lines and comments
-                    self.files_to_copy.append(filename)
-
+            self.files_to_copy = engine.parse_reference_file(self.reference_file)
             self.total_files = len(self.files_to_copy)
 
             if self.total_files == 0:
@@ -535,33 +1104,37 @@ class StarzShotsApp:
             messagebox.showerror("Error", f"Error reading reference file: {e}")
             return False
     
-    def find_files_in_source(self) -> None:
+    def find_files_in_source(self, engine: ModuleType) -> None:
         """Find all specified files in source directory and subdirectories."""
         self.log_message(f"Searching for files in '{self.source_dir}'...")
-        self.progress_label.config(text="Searching for files...")
+        self.progress_label.config(text="Indexing source directory...")
+        self.progress_var.set(0)
+        self.root.update_idletasks()
 
         self.found_files = {}
-        source_path = Path(self.source_dir)
+        self.found_sizes = {}
 
-        # Walk through all subdirectories
-        for i, file_to_find in enumerate(self.files_to_copy):
-            found = False
+        # Walk the tree once instead of once per reference entry
+        source_index = engine.SourceIndex(self.source_dir)
+        source_index.build()
+        self.log_message(f"Indexed {len(source_index)} files in source directory.")
+        self.progress_var.set(20)
+        self.progress_label.config(text="Searching for files...")
 
+        for i, file_to_find in enumerate(self.files_to_copy):
             # Update progress during search
-            search_progress = (i / self.total_files) * 30  # Use 30% for search phase
+            search_progress = 20 + (i / self.total_files) * 10  # Use 30% for index and search phase
             self.progress_var.set(search_progress)
-            self.root.update_idletasks()
-
-            # Search in source directory and all subdirectories
-            for file_path in source_path.rglob(file_to_find):
-                if file_path.is_file():
-                    self.found_files[file_to_find] = str(file_path)
-                    found = True
-                    break  # Take the first match found
 
-            if not found:
+            match = source_index.lookup(file_to_find)
+            if match:
+                self.found_files[file_to_find] = match[0]
+                self.found_sizes[file_to_find] = match[1]
+            else:
                 self.log_message(f"Warning: File '{file_to_find}' not found in source directory.")
 
+        self.root.update_idletasks()
+
         found_count = len(self.found_files)
         self.log_message(f"Found {found_count} out of {self.total_files} files in source directory.")
 
@@ -569,7 +1142,85 @@ class StarzShotsApp:
             messagebox.showwarning("Warning", "No files found in source directory!")
             return
 
-    def copy_files(self) -> None:
+    def plan_copy(self, engine: ModuleType) -> bool:
+        """Total the bytes to copy and check the destination has room for them."""
+        if not self.found_files:
+            return True
+
+        entries = [(filename, source_path, self.found_sizes[filename])
+                   for filename, source_path in self.found_files.items()]
+
+        if self.archive_format and not self.clear_existing_archive(engine):
+            return False
+
+        try:
+            # Archives are written as new files, so nothing in the destination is reclaimed
+            self.copy_plan = engine.CopyPlan(entries, self.dest_dir,
+                                             reclaim_existing=self.archive_format is None)
+        except OSError as e:
+            self.log_message(f"Error checking free space on destination: {e}")
+            messagebox.showerror("Error", f"Could not check free space on destination: {e}")
+            return False
+
+        plan = self.copy_plan
+        self.log_message("Copy plan:")
+        self.log_message(f"  Files to copy:        {plan.total_files}")
+        self.log_message(f"  Total size:           {engine.format_bytes(plan.total_bytes)}")
+        if plan.reclaimed_bytes:
+            self.log_message(f"  Overwritten in place: {engine.format_bytes(plan.reclaimed_bytes)}")
+        self.log_message(f"  Free on destination:  {engine.format_bytes(plan.free_bytes)}")
+
+        if not plan.has_enough_space:
+            shortfall = plan.required_bytes - plan.free_bytes
+            self.log_message(f"Error: Not enough free space on destination "
+                             f"({engine.format_bytes(shortfall)} short). Nothing was copied.")
+            messagebox.showerror("Error",
+                                 f"Not enough free space on destination.\n\n"
+                                 f"Required: {engine.format_bytes(plan.required_bytes)}\n"
+                                 f"Available: {engine.format_bytes(plan.free_bytes)}")
+            return False
+
+        return True
+
+    def make_archive_writer(self, engine: ModuleType):
+        """Return the archive writer for this job; the archive is named after the reference file."""
+        return engine.ArchiveWriter(self.dest_dir, Path(self.reference_file).stem,
+                                    self.archive_format, self.volume_size)
+
+    def clear_existing_archive(self, engine: ModuleType) -> bool:
+        """
+        Make sure no earlier delivery with the same archive name is left in the destination.
+
+        Leftover volumes would be overwritten, or mixed in with the new set
+        if the earlier run had more parts, so ask before deleting them.
+        """
+        existing = self.make_archive_writer(engine).existing_volumes()
+        if not existing:
+            return True
+
+        names = "\n".join(path.name for path in existing[:10])
+        if len(existing) > 10:
+            names += f"\n... and {len(existing) - 10} more"
+        self.log_message(f"Warning: {len(existing)} archive file(s) from an earlier delivery "
+                         f"already exist in destination.")
+        if not messagebox.askyesno("Archive already exists",
+                                   f"These archive files already exist in the destination:\n\n"
+                                   f"{names}\n\n"
+                                   f"Delete them and write a new delivery?"):
+            self.log_message("Copy cancelled. Existing archive left unchanged.")
+            return False
+
+        for path in existing:
+            try:
+                path.unlink()
+            except OSError as e:
+                self.log_message(f"Error deleting '{path.name}': {e}")
+                messagebox.showerror("Error", f"Could not delete existing archive '{path.name}': {e}")
+                return False
+            self.log_message(f"Deleted earlier archive: {path.name}")
+        return True
+
+    def copy_files(self, engine: ModuleType) -> None:
         """Copy found files to destination directory with progress tracking."""
         if not self.found_files:
             self.log_message("No files to copy.")
@@ -593,36 +1244,30 @@ class StarzShotsApp:
 
         self.copied_count = 0
         total_to_copy = len(self.found_files)
+        entries = self.copy_plan.entries if self.copy_plan else [
+            (filename, source_path, self.found_sizes[filename])
+            for filename, source_path in self.found_files.items()]
+        if self.rate_limiter.is_limited:
+            self.log_message(f"Throttle: {self.rate_limiter.describe()}")
+
+        start_time = time.monotonic()
+        if self.archive_format:
+            copied_bytes, report = self.copy_to_archive(engine, entries, start_time)
+        else:
+            copied_bytes, report = self.copy_to_folder(engine, entries, start_time)
+        if self.is_closing:
+            return
 
-        for filename, source_path in self.found_files.items():
-            try:
-                # Create destination file path
-                dest_path = Path(self.dest_dir) / filename
-
-                # Check if file already exists
-                if dest_path.exists():
-                    self.log_message(f"Warning: '{filename}' already exists in destination. Overwriting...")
-
-                # Copy the file
-                shutil.copy2(source_path, dest_path)
-                self.copied_count += 1
-
-                # Calculate and display progress
-                copy_progress = 30 + (self.copied_count / total_to_copy) * 70  # 30% for search, 70% for copy
-                self.progress_var.set(copy_progress)
-                progress_percent = (self.copied_count / total_to_copy) * 100
-                self.progress_label.config(text=f"Copying files... {self.copied_count}/{total_to_copy} ({progress_percent:.1f}%)")
-                self.log_message(f"[{progress_percent:6.1f}%] Copied: {filename}")
-
-                # Update UI
-                self.root.update_idletasks()
-
-            except Exception as e:
-                self.log_message(f"Error copying '{filename}': {e}")
+        elapsed = time.monotonic() - start_time
+        average_rate = copied_bytes / elapsed if elapsed > 0 else 0
 
         self.log_message("-" * 50)
         self.log_message(f"Copy operation completed!")
         self.log_message(f"Successfully copied {self.copied_count} out of {total_to_copy} files.")
+        self.log_message(f"Transferred {engine.format_bytes(copied_bytes)} in {engine.format_duration(elapsed)} "
+                         f"({engine.format_bytes(average_rate)}/s).")
+        for line in report:
+            self.log_message(f"  {line}")
 
         # Final progress update
         self.progress_var.set(100)
@@ -631,20 +1276,157 @@ class StarzShotsApp:
         # Show completion message
         messagebox.showinfo("Success", f"Copy operation completed!\nSuccessfully copied {self.copied_count} out of {total_to_copy} files.")
 
-    def run(self):
-        """Run the GUI application."""
+    def update_copy_progress(self, engine: ModuleType, copied_bytes: int, total_bytes: int,
+                             handled_count: int, total_to_copy: int, start_time: float) -> None:
+        """Show byte-weighted progress, throughput and ETA for the copy phase."""
+        fraction = copied_bytes / total_bytes if total_bytes else handled_count / total_to_copy
+        self.progress_var.set(30 + fraction * 70)  # 30% for search, 70% for copy
+
+        # Estimate time remaining from the throughput measured so far
+        elapsed = time.monotonic() - start_time
+        rate = copied_bytes / elapsed if elapsed > 0 else 0
+        eta = engine.format_duration((total_bytes - copied_bytes) / rate) if rate > 0 else "--:--"
+        self.progress_label.config(
+            text=f"Copying files... {self.copied_count}/{total_to_copy} | "
+                 f"{engine.format_bytes(copied_bytes)} of {engine.format_bytes(total_bytes)} "
+                 f"({fraction * 100:.1f}%) | {engine.format_bytes(rate)}/s | ETA {eta}")
+        self.root.update_idletasks()
+
+    def copy_to_folder(self, engine: ModuleType, entries: List[Tuple[str, str, int]],
+                       start_time: float) -> Tuple[int, List[str]]:
+        """Copy files into the destination folder through the size-based lanes."""
+        total_to_copy = len(entries)
+        total_bytes = sum(size for _, _, size in entries)
+        handled_count = 0
+
+        scheduler = engine.CopyScheduler(entries, self.dest_dir, limiter=self.rate_limiter)
+        self.log_message(f"Scheduling {len(scheduler.small_lane.entries)} small files and "
+                         f"{len(scheduler.large_lane.entries)} large files "
+                         f"(threshold {engine.format_bytes(engine.LARGE_FILE_THRESHOLD)}).")
+
+        def drain_events():
+            nonlocal handled_count, total_bytes
+            while True:
+                try:
+                    filename, size, overwritten, error = scheduler.events.get_nowait()
+                except queue.Empty:
+                    return
+                handled_count += 1
+                if overwritten:
+                    self.log_message(f"Warning: '{filename}' already exists in destination. Overwritten.")
+                if error is None:
+                    self.copied_count += 1
+                    progress_percent = (handled_count / total_to_copy) * 100
+                    self.log_message(f"[{progress_percent:6.1f}%] Copied: {filename}")
+                else:
+                    # Drop the failed file from the totals so the ETA is not skewed
+                    total_bytes -= size
+                    self.log_message(f"Error copying '{filename}': {error}")
+
+        self.active_schedulers.add(scheduler)
+        try:
+            scheduler.start()
+            finished = False
+            while not finished:
+                finished = scheduler.wait(engine.PROGRESS_UPDATE_INTERVAL)
+                if scheduler.cancelled:
+                    break
+                drain_events()
+                self.update_copy_progress(engine, scheduler.copied_bytes, total_bytes, handled_count,
+                                          total_to_copy, start_time)
+        except BaseException:
+            # Do not leave worker threads copying after the job has failed
+            scheduler.cancel()
+            raise
+        finally:
+            self.active_schedulers.discard(scheduler)
+
+        report = [lane.summary() for lane in scheduler.lanes if lane.entries]
+        return scheduler.copied_bytes, report
+
+    def copy_to_archive(self, engine: ModuleType, entries: List[Tuple[str, str, int]],
+                        start_time: float) -> Tuple[int, List[str]]:
+        """Stream files straight into a delivery archive in a single pass."""
+        total_to_copy = len(entries)
+        total_bytes = sum(size for _, _, size in entries)
+        copied_bytes = 0
+        last_update = 0.0
+
+        def on_chunk(num_bytes: int):
+            nonlocal copied_bytes, last_update
+            copied_bytes += num_bytes
+            now = time.monotonic()
+            if now - last_update >= engine.PROGRESS_UPDATE_INTERVAL:
+                last_update = now
+                self.update_copy_progress(engine, copied_bytes, total_bytes, i, total_to_copy, start_time)
+
+        stored_count = 0
+        with self.make_archive_writer(engine) as writer:
+            for i, (filename, source_path, size) in enumerate(entries):
+                volumes_before = list(writer.volumes)
+                bytes_before = copied_bytes
+                try:
+                    writer.add(filename, source_path, size, on_chunk, self.rate_limiter)
+                except engine.ArchiveEntryError as e:
+                    # The archive has been left without this file; carry on with the rest
+                    copied_bytes = bytes_before
+                    total_bytes -= size
+                    self.log_message(f"Error copying '{filename}': {e} (left out of the archive)")
+                    continue
+                if writer.volumes != volumes_before:
+                    self.log_message(f"Writing archive volume: {Path(writer.volumes[-1]).name}")
+                if self.archive_format == "zip" and Path(filename).suffix.lower() in engine.STORED_EXTENSIONS:
+                    stored_count += 1
+
+                self.copied_count += 1
+                progress_percent = ((i + 1) / total_to_copy) * 100
+                self.log_message(f"[{progress_percent:6.1f}%] Archived: {filename}")
+                self.update_copy_progress(engine, copied_bytes, total_bytes, i + 1, total_to_copy,
+                                          start_time)
+
+        archive_bytes = sum(Path(volume).stat().st_size for volume in writer.volumes)
+        report = [f"Archive: {len(writer.volumes)} volume(s), {engine.format_bytes(archive_bytes)} on disk"]
+        report.extend(f"  {volume}" for volume in writer.volumes)
+        if self.archive_format == "zip":
+            report.append(f"Stored without compression: {stored_count} files; "
+                          f"deflated: {self.copied_count - stored_count} files")
+        return copied_bytes, report
+
+    def run(self, startup_check: bool = False):
+        """
+        Run the GUI application.
+
+        With startup_check, the window closes as soon as it has been drawn,
+        so build_portable.py can time how long a cold start takes.
+        """
         self.log_message("Starz Shots File Copier started.")
         self.log_message("Please select source directory, destination directory, and reference file.")
         self.builder_log_message("Starz Shots reference file builder ready.")
         self.builder_log_message("Please select zip files and output directory.")
+        self.watch_log_message("Select a source directory, destination directory and drop folder, "
+                               "then click Start Watching.")
+        if startup_check:
+            self.root.after_idle(self.close_when_drawn)
         self.root.mainloop()
 
+    def close_when_drawn(self):
+        """
+        Close the window once it is on screen, for --startup-check.
+
+        An idle callback can run before the window manager has mapped the
+        window, so wait for it to become visible and finish its first
+        redraw; otherwise the timed start would not include drawing it.
+        """
+        self.root.wait_visibility()
+        self.root.update_idletasks()
+        self.root.destroy()
+
 
 def main():
     """Main function to run the Starz Shots application."""
     try:
         app = StarzShotsApp()
-        app.run()
+        app.run(startup_check="--startup-check" in sys.argv[1:])
     except Exception as e:
         print(f"Error starting application: {e}")
         messagebox.showerror("Error", f"Error starting application: {e}")
@@ -0,0 +1,450 @@
+"""Tests for the GUI-free copy engine (run with: python -m pytest)."""
+
+import errno
+import os
+import struct
+import sys
+import tarfile
+import threading
+import time
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from copy_engine import (ArchiveEntryError, ArchiveWriter, CopyScheduler, InotifyMonitor,
+                         PollingMonitor, RateLimiter, SourceIndex, TokenBucket, list_archive_members,
+                         list_destination_folder, reconcile)
+
+linux_only = pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux only")
+
+
+# TokenBucket / RateLimiter
+
+def test_unlimited_bucket_never_waits():
+    bucket = TokenBucket(0)
+    start = time.monotonic()
+    for _ in range(1000):
+        assert bucket.acquire(10 ** 9)
+    assert time.monotonic() - start < 0.5
+
+
+def test_bucket_enforces_rate():
+    bucket = TokenBucket(1000)
+    start = time.monotonic()
+    # The first second's worth is available immediately; the next 500 tokens take ~0.5s
+    bucket.acquire(1000)
+    bucket.acquire(500)
+    elapsed = time.monotonic() - start
+    assert 0.4 <= elapsed < 1.0
+
+
+def test_bucket_large_request_creates_debt():
+    bucket = TokenBucket(1000)
+    start = time.monotonic()
+    bucket.acquire(1500)  # Allowed straight away, leaving the bucket 500 tokens short
+    assert time.monotonic() - start < 0.1
+    bucket.acquire(1)
+    assert time.monotonic() - start >= 0.4
+
+
+def test_bucket_rate_change_applies_to_waiters():
+    bucket = TokenBucket(1)
+    bucket.acquire(1)
+    threading.Timer(0.2, bucket.set_rate, args=(0,)).start()
+    start = time.monotonic()
+    assert bucket.acquire(1)  # Would take a full second at the old rate
+    assert time.monotonic() - start < 0.6
+
+
+def test_bucket_acquire_stops_when_cancelled():
+    bucket = TokenBucket(1)
+    bucket.acquire(1)
+    cancel = threading.Event()
+    threading.Timer(0.1, cancel.set).start()
+    start = time.monotonic()
+    assert not bucket.acquire(1, cancel)
+    assert time.monotonic() - start < 0.5
+
+
+@pytest.mark.parametrize("rate", [float("inf"), float("nan"), -1])
+def test_bucket_rejects_unusable_rates(rate):
+    with pytest.raises(ValueError):
+        TokenBucket(rate)
+    with pytest.raises(ValueError):
+        TokenBucket(10).set_rate(rate)
+
+
+def test_rate_limiter_describe():
+    assert RateLimiter().describe() == "unlimited"
+    assert not RateLimiter().is_limited
+    limiter = RateLimiter(2 * 1024 * 1024, 5)
+    assert limiter.is_limited
+    assert limiter.describe() == "2.0 MB/s, 5 files/s"
+
+
+# SourceIndex and change monitors
+
+@pytest.fixture
+def source(tmp_path):
+    root = tmp_path / "source"
+    (root / "b" / "deep").mkdir(parents=True)
+    (root / "a").mkdir()
+    (root / "top.jpg").write_bytes(b"1")
+    (root / "a" / "dup.jpg").write_bytes(b"22")
+    (root / "b" / "dup.jpg").write_bytes(b"333")
+    (root / "b" / "deep" / "x.txt").write_bytes(b"4444")
+    return root
+
+
+def test_index_build_and_lookup(source):
+    index = SourceIndex(str(source))
+    index.build()
+    assert len(index) == 4
+    assert len(index.directories()) == 4
+    assert index.lookup("top.jpg") == (str(source / "top.jpg"), 1)
+    assert index.lookup("x.txt") == (str(source / "b" / "deep" / "x.txt"), 4)
+    # The lowest path wins when a name exists more than once
+    assert index.lookup("dup.jpg") == (str(source / "a" / "dup.jpg"), 2)
+    assert index.lookup("nope.jpg") is None
+
+
+def test_index_single_file_updates(source):
+    index = SourceIndex(str(source))
+    index.build()
+    (source / "a" / "new.jpg").write_bytes(b"55555")
+    index.update_file(str(source / "a" / "new.jpg"))
+    assert index.lookup("new.jpg") == (str(source / "a" / "new.jpg"), 5)
+    os.remove(source / "a" / "dup.jpg")
+    index.remove_file(str(source / "a" / "dup.jpg"))
+    assert index.lookup("dup.jpg") == (str(source / "b" / "dup.jpg"), 3)
+    index.remove_tree(str(source / "b"))
+    assert index.lookup("dup.jpg") is None
+    assert index.lookup("x.txt") is None
+    assert len(index) == 2
+
+
+def test_index_poll_picks_up_create_delete_and_rename(source):
+    index = SourceIndex(str(source))
+    index.build()
+    (source / "a" / "new.jpg").write_bytes(b"1")
+    os.remove(source / "top.jpg")
+    os.rename(source / "b" / "deep", source / "b" / "moved")
+    (source / "c").mkdir()
+    (source / "c" / "in_c.jpg").write_bytes(b"1")
+    assert index.poll() > 0
+    assert index.lookup("new.jpg") is not None
+    assert index.lookup("top.jpg") is None
+    assert index.lookup("x.txt") == (str(source / "b" / "moved" / "x.txt"), 4)
+    assert index.lookup("in_c.jpg") is not None
+    assert index.poll() == 0
+
+
+def test_polling_monitor_polls_on_interval(source):
+    index = SourceIndex(str(source))
+    index.build()
+    monitor = PollingMonitor(index, interval=0.05)
+    (source / "new.jpg").write_bytes(b"1")
+    monitor.process(0.1)
+    assert index.lookup("new.jpg") is not None
+
+
+def inotify_event(wd: int, mask: int, name: str = "") -> bytes:
+    """Pack one raw inotify event, with the name padded like the kernel does."""
+    raw = name.encode()
+    if raw:
+        raw += b"\0" * (16 - len(raw) % 16)
+    return struct.pack("iIII", wd, mask, 0, len(raw)) + raw
+
+
+@linux_only
+def test_inotify_event_parsing(source):
+    index = SourceIndex(str(source))
+    index.build()
+    monitor = InotifyMonitor(index)
+    try:
+        wd_a = monitor._watched[str(source / "a")]
+        wd_b = monitor._watched[str(source / "b")]
+        (source / "a" / "new.jpg").write_bytes(b"12")
+        os.remove(source / "a" / "dup.jpg")
+        (source / "a" / "sub").mkdir()
+        (source / "a" / "sub" / "inner.jpg").write_bytes(b"1")
+        monitor._apply_events(
+            inotify_event(wd_a, InotifyMonitor.IN_CLOSE_WRITE, "new.jpg") +
+            inotify_event(wd_a, InotifyMonitor.IN_DELETE, "dup.jpg") +
+            inotify_event(wd_a, InotifyMonitor.IN_CREATE | InotifyMonitor.IN_ISDIR, "sub") +
+            inotify_event(wd_b, InotifyMonitor.IN_MOVED_FROM | InotifyMonitor.IN_ISDIR, "deep") +
+            inotify_event(999, InotifyMonitor.IN_CLOSE_WRITE, "unknown.jpg")
+        )
+        assert index.lookup("new.jpg") == (str(source / "a" / "new.jpg"), 2)
+        assert index.lookup("dup.jpg") == (str(source / "b" / "dup.jpg"), 3)
+        assert index.lookup("inner.jpg") is not None
+        assert index.lookup("x.txt") is None
+        # The new directory is watched, and the removed one is not
+        assert str(source / "a" / "sub") in monitor._watched
+        assert str(source / "b" / "deep") not in monitor._watched
+    finally:
+        monitor.close()
+
+
+@linux_only
+def test_inotify_sees_real_changes(source):
+    index = SourceIndex(str(source))
+    index.build()
+    monitor = InotifyMonitor(index)
+    try:
+        (source / "a" / "new.jpg").write_bytes(b"12")
+        os.rename(source / "top.jpg", source / "b" / "renamed.jpg")
+        deadline = time.monotonic() + 2
+        while index.lookup("renamed.jpg") is None and time.monotonic() < deadline:
+            monitor.process(0.1)
+        assert index.lookup("new.jpg") == (str(source / "a" / "new.jpg"), 2)
+        assert index.lookup("renamed.jpg") == (str(source / "b" / "renamed.jpg"), 1)
+        assert index.lookup("top.jpg") is None
+    finally:
+        monitor.close()
+
+
+class FailingWatchLibc:
+    """Stands in for libc when the kernel refuses every new watch."""
+
+    def __init__(self, libc):
+        self._libc = libc
+
+    def inotify_add_watch(self, fd, path, mask):
+        return -1
+
+    def inotify_rm_watch(self, fd, wd):
+        return self._libc.inotify_rm_watch(fd, wd)
+
+
+@linux_only
+def test_inotify_failed_watch_is_logged_and_polled(source):
+    index = SourceIndex(str(source))
+    index.build()
+    messages = []
+    monitor = InotifyMonitor(index, messages.append)
+    try:
+        assert monitor.poll_interval > 2.0
+        monitor._libc = FailingWatchLibc(monitor._libc)
+        monitor._get_errno = lambda: errno.ENOSPC
+        (source / "c").mkdir()
+        index.scan_tree(str(source / "c"))
+        monitor._sync_watches()
+        assert any("errno 28" in message and "'" + str(source / "c") + "'" in message
+                   for message in messages)
+        assert monitor.poll_interval == 2.0
+        # The unwatched folder is not retried (or reported again) on every batch
+        monitor._sync_watches()
+        assert sum("errno" in message for message in messages) == 1
+
+        (source / "c" / "late.jpg").write_bytes(b"1")
+        monitor._last_poll -= monitor.poll_interval
+        monitor.process(0)
+        assert index.lookup("late.jpg") is not None
+    finally:
+        monitor.close()
+
+
+# ArchiveWriter
+
+def make_files(folder: Path, sizes: dict) -> dict:
+    """Create files of the given sizes and return {name: path}."""
+    folder.mkdir(parents=True, exist_ok=True)
+    paths = {}
+    for name, size in sizes.items():
+        path = folder / name
+        path.write_bytes(bytes(i % 251 for i in range(size)))
+        paths[name] = str(path)
+    return paths
+
+
+def archive_members(path: str) -> list:
+    if path.endswith(".zip"):
+        with zipfile.ZipFile(path) as archive:
+            assert archive.testzip() is None
+            return archive.namelist()
+    with tarfile.open(path) as archive:
+        return archive.getnames()
+
+
+@pytest.mark.parametrize("archive_format", ["zip", "tar"])
+def test_archive_single_volume(tmp_path, archive_format):
+    files = make_files(tmp_path / "src", {"a.txt": 100, "b.jpg": 200})
+    with ArchiveWriter(str(tmp_path), "job", archive_format) as writer:
+        for name, path in files.items():
+            writer.add(name, path, Path(path).stat().st_size)
+    assert writer.volumes == [str(tmp_path / f"job.{archive_format}")]
+    assert archive_members(writer.volumes[0]) == ["a.txt", "b.jpg"]
+
+
+def test_archive_splits_into_volumes(tmp_path):
+    files = make_files(tmp_path / "src", {"a.jpg": 600, "b.jpg": 600, "c.jpg": 300, "big.jpg": 2000})
+    with ArchiveWriter(str(tmp_path), "job", "zip", volume_size=1000) as writer:
+        for name, path in files.items():
+            writer.add(name, path, Path(path).stat().st_size)
+    assert [Path(v).name for v in writer.volumes] == ["job.part001.zip", "job.part002.zip", "job.part003.zip"]
+    # A file larger than a volume still gets one to itself
+    assert [archive_members(v) for v in writer.volumes] == [["a.jpg"], ["b.jpg", "c.jpg"], ["big.jpg"]]
+
+
+def test_archive_stores_media_and_deflates_the_rest(tmp_path):
+    files = make_files(tmp_path / "src", {"photo.JPG": 500, "notes.txt": 500})
+    with ArchiveWriter(str(tmp_path), "job", "zip") as writer:
+        for name, path in files.items():
+            writer.add(name, path, 500)
+    with zipfile.ZipFile(writer.volumes[0]) as archive:
+        assert archive.getinfo("photo.JPG").compress_type == zipfile.ZIP_STORED
+        assert archive.getinfo("notes.txt").compress_type == zipfile.ZIP_DEFLATED
+
+
+def test_archive_finds_and_never_overwrites_existing_volumes(tmp_path):
+    for name in ("job.zip", "JOB.part001.zip", "job.part002.zip", "job.tar", "other.zip", "job.zip.bak"):
+        (tmp_path / name).write_bytes(b"old")
+    writer = ArchiveWriter(str(tmp_path), "job", "zip", volume_size=1000)
+    assert [p.name for p in writer.existing_volumes()] == ["JOB.part001.zip", "job.part002.zip", "job.zip"]
+
+    files = make_files(tmp_path / "src", {"a.txt": 10})
+    with pytest.raises(FileExistsError):
+        with ArchiveWriter(str(tmp_path), "job", "zip") as writer:
+            writer.add("a.txt", files["a.txt"], 10)
+    assert (tmp_path / "job.zip").read_bytes() == b"old"
+
+
+def test_archive_missing_destination_has_no_existing_volumes(tmp_path):
+    assert ArchiveWriter(str(tmp_path / "missing"), "job", "tar").existing_volumes() == []
+
+
+def fail_part_way(done):
+    """Progress callback that fails once some of the file has been written, like a read error would."""
+    raise OSError("read failed")
+
+
+@pytest.mark.parametrize("archive_format", ["zip", "tar"])
+def test_archive_drops_file_that_fails_part_way(tmp_path, archive_format):
+    files = make_files(tmp_path / "src", {"a.txt": 5000, "bad.txt": 300000, "c.txt": 5000})
+    with ArchiveWriter(str(tmp_path), "job", archive_format) as writer:
+        writer.add("a.txt", files["a.txt"], 5000)
+        with pytest.raises(ArchiveEntryError) as excinfo:
+            writer.add("bad.txt", files["bad.txt"], 300000, fail_part_way)
+        assert excinfo.value.arcname == "bad.txt"
+        writer.add("c.txt", files["c.txt"], 5000)
+    assert writer.volumes == [str(tmp_path / f"job.{archive_format}")]
+    assert archive_members(writer.volumes[0]) == ["a.txt", "c.txt"]
+
+
+@pytest.mark.parametrize("archive_format", ["zip", "tar"])
+def test_archive_failure_does_not_rewrite_earlier_files(tmp_path, monkeypatch, archive_format):
+    files = make_files(tmp_path / "src", {"a.txt": 5000, "bad.txt": 300000})
+    opened = []
+    real_open = open
+
+    def recording_open(path, *args, **kwargs):
+        opened.append(os.path.basename(path))
+        return real_open(path, *args, **kwargs)
+
+    monkeypatch.setattr("copy_engine.open", recording_open, raising=False)
+    with ArchiveWriter(str(tmp_path), "job", archive_format) as writer:
+        writer.add("a.txt", files["a.txt"], 5000)
+        with pytest.raises(ArchiveEntryError):
+            writer.add("bad.txt", files["bad.txt"], 300000, fail_part_way)
+    assert opened == ["a.txt", "bad.txt"]
+
+    # The volume was cut back to where the failed file started
+    (tmp_path / "clean").mkdir()
+    with ArchiveWriter(str(tmp_path / "clean"), "job", archive_format) as clean:
+        clean.add("a.txt", files["a.txt"], 5000)
+    assert Path(writer.volumes[0]).read_bytes() == Path(clean.volumes[0]).read_bytes()
+
+
+def test_archive_failed_file_alone_in_volume_leaves_no_empty_volume(tmp_path):
+    files = make_files(tmp_path / "src", {"a.txt": 800, "bad.txt": 800, "c.txt": 800, "bad2.txt": 800})
+    with ArchiveWriter(str(tmp_path), "job", "zip", volume_size=1000) as writer:
+        writer.add("a.txt", files["a.txt"], 800)
+        with pytest.raises(ArchiveEntryError):
+            writer.add("bad.txt", files["bad.txt"], 800, fail_part_way)
+        writer.add("c.txt", files["c.txt"], 800)
+        with pytest.raises(ArchiveEntryError):
+            writer.add("bad2.txt", files["bad2.txt"], 800, fail_part_way)
+    assert [archive_members(v) for v in writer.volumes] == [["a.txt"], ["c.txt"]]
+    assert sorted(p.name for p in tmp_path.glob("*.zip")) == ["job.part001.zip", "job.part002.zip"]
+
+
+def test_archive_applies_files_per_second_limit(tmp_path):
+    files = make_files(tmp_path / "src", {f"{i}.txt": 10 for i in range(30)})
+    limiter = RateLimiter(0, 20)
+    start = time.monotonic()
+    with ArchiveWriter(str(tmp_path), "job", "zip") as writer:
+        for name, path in files.items():
+            writer.add(name, path, 10, limiter=limiter)
+    # 20 files are allowed straight away, the other 10 take about half a second
+    assert time.monotonic() - start >= 0.4
+
+
+def test_archive_missing_source_is_an_entry_error(tmp_path):
+    with ArchiveWriter(str(tmp_path), "job", "zip") as writer:
+        with pytest.raises(ArchiveEntryError):
+            writer.add("gone.txt", str(tmp_path / "gone.txt"), 10)
+    assert writer.volumes == []
+
+
+# CopyScheduler
+
+def test_scheduler_cancel_drops_queued_files_and_stops(tmp_path):
+    files = make_files(tmp_path / "src", {f"{i}.jpg": 1000 for i in range(40)})
+    entries = [(name, path, 1000) for name, path in files.items()]
+    (tmp_path / "dest").mkdir()
+    # At 5 files/s the whole job would take about 7 seconds
+    scheduler = CopyScheduler(entries, str(tmp_path / "dest"), limiter=RateLimiter(0, 5))
+    scheduler.start()
+    time.sleep(0.2)
+    scheduler.cancel()
+    start = time.monotonic()
+    while not scheduler.wait(0.1):
+        assert time.monotonic() - start < 2
+    assert scheduler.cancelled
+    assert len(list((tmp_path / "dest").iterdir())) < 40
+
+
+# Reconciliation
+
+@pytest.fixture
+def delivery(tmp_path):
+    """A source and a reference list covering every reconcile status."""
+    files = make_files(tmp_path / "src", {"ok.jpg": 10, "short.jpg": 10, "undelivered.jpg": 10})
+    index = SourceIndex(str(tmp_path / "src"))
+    index.build()
+    reference = ["ok.jpg", "short.jpg", "undelivered.jpg", "nowhere.jpg", "gone_from_source.jpg", "ok.jpg"]
+    return files, index, reference
+
+
+EXPECTED_STATUSES = [
+    ("missing_from_source", "nowhere.jpg"),
+    ("missing_from_destination", "undelivered.jpg"),
+    ("size_mismatch", "short.jpg"),
+    ("extra_in_destination", "stray.jpg"),
+]
+
+
+def test_reconcile_folder_delivery(tmp_path, delivery):
+    files, index, reference = delivery
+    dest = tmp_path / "dest"
+    make_files(dest, {"ok.jpg": 10, "short.jpg": 4, "gone_from_source.jpg": 10, "stray.jpg": 1})
+    (dest / "subfolder").mkdir()
+    rows = reconcile(reference, index, list_destination_folder(str(dest)))
+    assert [(status, name) for status, name, *_ in rows] == EXPECTED_STATUSES
+    assert rows[2] == ("size_mismatch", "short.jpg", files["short.jpg"], 10, 4)
+
+
+@pytest.mark.parametrize("archive_format", ["zip", "tar"])
+def test_reconcile_archive_delivery(tmp_path, delivery, archive_format):
+    files, index, reference = delivery
+    extra = make_files(tmp_path / "extra", {"short.jpg": 4, "gone_from_source.jpg": 10, "stray.jpg": 1})
+    with ArchiveWriter(str(tmp_path), "job", archive_format, volume_size=12) as writer:
+        for name, path in [("ok.jpg", files["ok.jpg"])] + list(extra.items()):
+            writer.add(name, path, Path(path).stat().st_size)
+    assert len(writer.volumes) > 1
+    rows = reconcile(reference, index, list_archive_members(writer.volumes))
+    assert [(status, name) for status, name, *_ in rows] == EXPECTED_STATUSES
+    # Archive sizes are the original file sizes, not the compressed ones
+    assert rows[2][4] == 4